@@ -0,0 +1,114 @@
+"""Micro-benchmark: indexed ProductExtractor vs. the old per-lookup linear scan.
+
+    python benchmarks/bench_extractor.py [--payloads 2000] [--components 60]
+"""
+import argparse
+import sys
+import timeit
+
+from tokopaedi.get_product import (
+    ProductExtractor,
+    index_components,
+    extract_media,
+    extract_options,
+    extract_variants,
+    extract_scalars,
+)
+from tokopaedi.tokopaedi_types import ProductData
+
+
+def legacy_lookup(components):
+    # product_details_extractor before components were indexed: one full scan
+    # of the layout per component lookup
+    def find_component(name):
+        for c in components:
+            if c.get("name") == name:
+                return c.get("data", [])
+        return []
+
+    return (
+        find_component("product_content"),
+        find_component("product_media"),
+        find_component("mini_variant_options"),
+    )
+
+
+def legacy_extractor(json_data):
+    pdp = json_data.get("data", {}).get("pdpGetLayout", {})
+    components = pdp.get("components", [])
+
+    def find_component(name):
+        for c in components:
+            if c.get("name") == name:
+                return c.get("data", [])
+        return []
+
+    product_content = find_component("product_content")
+    product_content = product_content[0] if product_content else {}
+    product_media_raw = find_component("product_media")
+    product_media_raw = product_media_raw[0].get("media", []) if product_media_raw else []
+    mini_variant = find_component("mini_variant_options")
+    mini_variant = mini_variant[0] if mini_variant else {}
+    return ProductData(
+        **extract_scalars(pdp.get("basicInfo", {}), product_content),
+        product_media=extract_media(product_media_raw),
+        product_option=extract_options(mini_variant),
+        variants=extract_variants(mini_variant),
+    )
+
+
+def synthetic_payload(product_id, components=60, variants=4, media=5):
+    # PDP layouts carry dozens of widgets; the ones we read sit among them
+    filler = [{"name": f"widget_{i}", "type": "widget", "data": [{}]} for i in range(components - 3)]
+    wanted = [
+        {"name": "product_media", "data": [{"media": [
+            {"URLOriginal": f"o{i}", "URLThumbnail": f"t{i}", "URLMaxRes": f"m{i}"} for i in range(media)
+        ]}]},
+        {"name": "product_content", "data": [{"name": f"product {product_id}", "price": {"value": 1000, "priceFmt": "Rp1.000"}}]},
+        {"name": "mini_variant_options", "data": [{
+            "variants": [{"productVariantID": "1", "name": "Warna", "option": [{"value": str(i)} for i in range(variants)]}],
+            "children": [{"optionID": [i], "productName": f"v{i}", "price": 1000, "stock": {"value": i}} for i in range(variants)],
+        }]},
+    ]
+    layout = filler[: len(filler) // 2] + wanted[:1] + filler[len(filler) // 2:] + wanted[1:]
+    return {"data": {"pdpGetLayout": {
+        "basicInfo": {"productID": str(product_id), "totalStockFmt": "10", "stats": {"rating": 5}},
+        "components": layout,
+    }}}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--payloads", type=int, default=2000)
+    parser.add_argument("--components", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    payloads = [synthetic_payload(i, args.components) for i in range(args.payloads)]
+    extractor = ProductExtractor()
+    assert [legacy_extractor(p) for p in payloads[:10]] == list(extractor.extract_many(payloads[:10]))
+
+    layouts = [p["data"]["pdpGetLayout"]["components"] for p in payloads]
+
+    def best(fn):
+        return min(timeit.repeat(fn, number=1, repeat=args.repeat))
+
+    # interleave the runs so warm-up and allocator state affect both sides
+    best(lambda: [legacy_extractor(p) for p in payloads])
+    lookup_legacy = best(lambda: [legacy_lookup(c) for c in layouts])
+    lookup_indexed = best(lambda: [index_components(c) for c in layouts])
+    full_legacy = best(lambda: [legacy_extractor(p) for p in payloads])
+    full_indexed = best(lambda: list(extractor.extract_many(payloads)))
+
+    print(f"payloads={args.payloads} components={args.components}")
+    print(f"{'':16}{'linear scan':>14}{'indexed':>14}{'speedup':>10}")
+    for label, legacy, indexed in (
+        ("component lookup", lookup_legacy, lookup_indexed),
+        ("full extraction", full_legacy, full_indexed),
+    ):
+        print(f"{label:16}{legacy * 1e6 / args.payloads:11.1f} us{indexed * 1e6 / args.payloads:11.1f} us{legacy / indexed:9.2f}x")
+    return 0 if lookup_indexed < lookup_legacy else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""Benchmark suite: extractors, dedupe, serialization and an end-to-end crawl.
+
+    python benchmarks/bench_suite.py                      # compare against baseline.json
+    python benchmarks/bench_suite.py --save-baseline      # record a new baseline
+    python benchmarks/bench_suite.py --sizes 100 1000 --only search_extractor dedupe
+
+Every benchmark runs on synthetic datasets of each size and reports the best
+time per product. Results are compared with benchmarks/baseline.json and the
+script exits 1 when any case is more than --tolerance slower. Baselines are
+machine specific; re-record them when switching hardware.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import timeit
+
+from tokopaedi import SearchResults, TokopaediClient, RetryPolicy, enrich, search
+from tokopaedi.fake_server import FakeGraphQLServer, FakeTokopedia, pdp_payload, review_payload, search_product_payload
+from tokopaedi.get_product import product_details_extractor
+from tokopaedi.get_reviews import extract_reviews
+from tokopaedi.search import dedupe, search_extractor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE = os.path.join(HERE, "baseline.json")
+SIZES = (100, 1000, 10000, 100000)
+
+
+def synthetic_product(product_id, rng, reviews=3, variants=3, media=4):
+    # One product in the SearchResults.json() shape (see output.json)
+    price = rng.randint(10, 5000) * 1000
+    name = f"Mouse Wireless {product_id} " + rng.choice(("Logitech", "Rexus", "Fantech", "Razer"))
+    url = f"https://www.tokopedia.com/shop{product_id % 97}/product-{product_id}"
+    return {
+        "product_id": product_id,
+        "product_sku": str(10 ** 18 + product_id),
+        "name": name,
+        "category": "Komputer & Laptop",
+        "url": url,
+        "sold_count": rng.randint(0, 100000),
+        "original_price": f"Rp{price * 2:,}".replace(",", "."),
+        "real_price": price,
+        "real_price_text": f"Rp{price:,}".replace(",", "."),
+        "rating": round(rng.uniform(3, 5), 1),
+        "image": f"https://images.tokopedia.net/img/{product_id}.jpg",
+        "shop": {"shop_id": product_id % 97, "name": f"Shop {product_id % 97}", "city": "Jakarta",
+                 "url": f"https://www.tokopedia.com/shop{product_id % 97}", "is_official": product_id % 5 == 0},
+        "product_detail": {
+            "product_id": str(product_id), "product_name": name, "url": url, "product_status": "ACTIVE",
+            "product_price": price, "product_price_text": f"Rp{price}", "product_price_original": "",
+            "product_discount_percentage": "", "weight": 150, "weight_unit": "GRAM",
+            "product_media": [{"original": f"o{i}", "thumbnail": f"t{i}", "max_res": f"m{i}"} for i in range(media)],
+            "sold_count": 10, "rating": 4.8, "review_count": reviews, "discussion_count": 0, "total_stock": 100,
+            "etalase": "Mouse", "etalase_url": "", "category": "Mouse", "sub_category": ["Komputer & Laptop"],
+            "product_option": [{"option_id": 1, "option_name": "warna", "option_child": [str(i) for i in range(variants)]}],
+            "variants": [
+                {"option_ids": [i], "option_name": f"{name} - {i}", "option_url": f"{url}-{i}", "price": price,
+                 "price_string": f"Rp{price}", "discount": "", "image_url": f"v{i}", "stock": i}
+                for i in range(variants)
+            ],
+            "shop_id": product_id % 97, "shop_name": f"Shop {product_id % 97}", "shop_location": "Jakarta",
+        },
+        "product_reviews": [
+            {"feedback_id": product_id * 100 + i, "variant_name": "", "message": "Barang bagus, pengiriman cepat " * 3,
+             "rating": 5.0, "review_age": "1 bulan lalu", "user_full_name": "B***n", "user_url": "",
+             "response_message": "", "response_created_text": "", "images": [], "videos": [], "likes": i}
+            for i in range(reviews)
+        ],
+    }
+
+
+class Dataset:
+    # Synthetic products plus the raw GraphQL payloads the extractors consume
+    def __init__(self, size, seed=0):
+        rng = random.Random(seed)
+        self.size = size
+        self.products = [synthetic_product(i + 1, rng) for i in range(size)]
+        self.search_pages = [
+            {"products": [search_product_payload(p) for p in self.products[i:i + 60]]}
+            for i in range(0, size, 60)
+        ]
+        self.pdp_payloads = [{"data": {"pdpGetLayout": pdp_payload(p)}} for p in self.products]
+        self.review_payloads = [
+            {"data": {"productrevGetProductReviewList": {"list": [review_payload(r) for r in p["product_reviews"]], "hasNext": False}}}
+            for p in self.products
+        ]
+        # half of the search results are duplicates, as with overlapping keywords
+        self.search_results = [item for page in self.search_pages for item in search_extractor(page)]
+        self.with_duplicates = self.search_results + self.search_results[: size // 2]
+        self.results = SearchResults.from_json(self.products)
+
+
+def load_preprocess():
+    try:
+        sys.path.insert(0, os.path.dirname(HERE))
+        from streamlit_app import preprocess_data
+    except ImportError:
+        return None
+    # preprocess_data is wrapped in @st.cache_data; time the function itself,
+    # not cache hits on the repeated dataset
+    return getattr(preprocess_data, "__wrapped__", preprocess_data)
+
+
+def cases(preprocess):
+    yield "search_extractor", lambda d: [search_extractor(page) for page in d.search_pages]
+    yield "product_details_extractor", lambda d: [product_details_extractor(p) for p in d.pdp_payloads]
+    yield "extract_reviews", lambda d: [extract_reviews(p) for p in d.review_payloads]
+    yield "dedupe", lambda d: dedupe(d.with_duplicates)
+    yield "SearchResults.json", lambda d: d.results.json()
+    if preprocess is not None:
+        yield "preprocess_data", lambda d: preprocess(d.products)
+
+
+def end_to_end(size, workers):
+    # search + enrich against a local FakeGraphQLServer over real HTTP
+    rng = random.Random(1)
+    catalog = [synthetic_product(i + 1, rng) for i in range(size)]
+    app = FakeTokopedia(catalog, page_size=60)
+    with FakeGraphQLServer(app) as server:
+        with TokopaediClient(base_url=server.base_url, pool_size=workers, retry=RetryPolicy(backoff=0)) as client:
+            start = time.perf_counter()
+            results = search("mouse", max_result=size, client=client)
+            enrich(results, reviews=3, workers=workers, client=client)
+            elapsed = time.perf_counter() - start
+    assert len(results) == size, len(results)
+    return elapsed
+
+
+def run(sizes, repeat, only, e2e_size, workers):
+    preprocess = load_preprocess()
+    if preprocess is None and (not only or "preprocess_data" in only):
+        print("skipping preprocess_data: streamlit_app dependencies are not installed")
+
+    timings = {}
+    for size in sizes:
+        dataset = Dataset(size)
+        for name, fn in cases(preprocess):
+            if only and name not in only:
+                continue
+            number = max(1, 1000 // size)
+            best = min(timeit.repeat(lambda: fn(dataset), number=number, repeat=repeat)) / number
+            timings[f"{name}[{size}]"] = best / size
+            print(f"{name:28}{size:>8}{best * 1e6 / size:12.2f} us/product")
+
+    if e2e_size and (not only or "end_to_end" in only):
+        best = min(end_to_end(e2e_size, workers) for _ in range(max(1, repeat // 2)))
+        timings[f"end_to_end[{e2e_size}]"] = best / e2e_size
+        print(f"{'end_to_end':28}{e2e_size:>8}{best * 1e6 / e2e_size:12.2f} us/product ({e2e_size / best:.0f} products/s)")
+    return timings
+
+
+def compare(timings, baseline, tolerance):
+    regressions = []
+    for key, value in sorted(timings.items()):
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        ratio = value / previous
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{key:36}{previous * 1e6:10.2f}{value * 1e6:10.2f} us{ratio:8.2f}x {flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", default=None, help="benchmark names to run")
+    parser.add_argument("--e2e-size", type=int, default=1000, help="products crawled end to end, 0 to skip")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown before failing (shared CI boxes are noisy)")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    timings = run(args.sizes, args.repeat, args.only, args.e2e_size, args.workers)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(), "timings": timings}, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["timings"]
+    print(f"\n{'case':36}{'baseline':>10}{'current':>10}")
+    regressions = compare(timings, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
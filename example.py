@@ -1,4 +1,4 @@
-from tokopaedi import search, SearchFilters, get_product, get_reviews, combine_data
+from tokopaedi import search, SearchFilters, enrich
 from dataclasses import dataclass, asdict
 import json
 
@@ -10,12 +10,7 @@ filters = SearchFilters(
         )
 
 results = search("mouse logitech", max_result=100, debug=False)
-for result in results:
-    combine_data(
-        result,
-        get_product(product_id=result.product_id, debug=True),
-        get_reviews(product_id=result.product_id, max_result=20, debug=True)
-    )
+enrich(results, details=True, reviews=20, workers=8, debug=True)
 
 # Save results to output.json
 with open('output.json', 'w') as f:
@@ -1,10 +1,23 @@
 __version__ = '0.1.0'
 from dataclasses import dataclass
 from typing import Optional
-from .search import search
-from .get_product import get_product
-from .get_reviews import get_reviews
-from .tokopaedi_types import ProductSearchResult, ProductData, ProductReview
+from .search import search, search_iter, async_search, SearchPageError
+from .get_product import get_product, get_products, get_product_batch, async_get_product, LazyProductData, ProductExtractor
+from .get_reviews import get_reviews, async_get_reviews
+from .enrich import enrich
+from .multi_search import search_many
+from .sharding import sharded_search
+from .cache import ResponseCache
+from .checkpoint import CrawlJournal
+from .sink import JsonlSink, results_to_jsonl
+from .export import to_arrow_tables, to_parquet
+from .rate_limit import RateLimiter, RetryPolicy
+from .get_fingerprint import FingerprintPool
+from .metrics import MetricsHook, PrometheusMetrics
+from .monitor import PriceMonitor
+from .tracing import Tracer, InMemoryExporter, JsonFileExporter, OpenTelemetryBridge
+from .client import TokopaediClient, AsyncTokopaediClient, get_default_client, set_default_client
+from .tokopaedi_types import SearchResults, ProductSearchResult, ProductData, ProductReview, ProductOutcome, ProductChange
 
 def combine_data(
     search_result: ProductSearchResult,
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl
+from .fast_json import loads
+
+DEFAULT_TTL = {
+    'search': 10 * 60,
+    'product': 60 * 60,
+    'reviews': 6 * 60 * 60,
+}
+
+def normalize_variables(endpoint, variables):
+    # Only the variables that change the response go into the cache key
+    if endpoint == 'search':
+        params = sorted(parse_qsl(variables.get('params', ''), keep_blank_values=True))
+        return {'params': params, 'query': variables.get('query')}
+    if endpoint == 'product':
+        return {k: variables.get(k) for k in ('productId', 'shopDomain', 'productKey')}
+    if endpoint == 'reviews':
+        return {k: variables.get(k) for k in ('productID', 'page', 'limit', 'sortBy', 'filterBy')}
+    return variables
+
+def cache_key(endpoint, json_data):
+    operations = json_data if isinstance(json_data, list) else [json_data]
+    normalized = [
+        {
+            'variables': normalize_variables(endpoint, op.get('variables', {})),
+            # different field selections must not share an entry
+            'query': hashlib.sha1(op.get('query', '').encode('utf-8')).hexdigest(),
+        }
+        for op in operations
+    ]
+    raw = json.dumps([endpoint, normalized], sort_keys=True, default=str)
+    return f"{endpoint}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+# The root field each fetcher reads; the other roots of the full search
+# query (ads, navigation, inspiration, last filter) may be null on a good page
+MAIN_FIELDS = {
+    'search': 'searchProductV5',
+    'product': 'pdpGetLayout',
+    'reviews': 'productrevGetProductReviewList',
+}
+
+def cacheable(endpoint, payload):
+    # Only answers whose main field came back are stored. A null one (product
+    # not found, a transient backend failure) would otherwise be served for
+    # the whole TTL.
+    field = MAIN_FIELDS.get(endpoint)
+    operations = payload if isinstance(payload, list) else [payload]
+    for op in operations:
+        data = op.get('data') if isinstance(op, dict) else None
+        if not isinstance(data, dict) or (field and data.get(field) is None):
+            return False
+    return True
+
+def store_decoded(client, endpoint, response, payload):
+    # Called with the payload a fetcher already decoded; the client only
+    # marks which fresh 200 responses are waiting to be stored
+    key = getattr(response, 'pending_cache_key', None)
+    if key and cacheable(endpoint, payload):
+        client.cache.set(key, endpoint, response.content, response.status_code)
+
+class CachedResponse:
+    # Minimal stand-in for a curl_cffi Response served from the cache
+    from_cache = True
+
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return loads(self.content)
+
+class ResponseCache:
+    # SQLite-backed response cache. Entries expire after the per-endpoint TTL
+    # (seconds) and the least recently used entries are evicted once the
+    # cache holds more than max_entries rows. path=":memory:" keeps it
+    # in-process only.
+    def __init__(self, path='tokopaedi_cache.sqlite', ttl=None, max_entries=10000):
+        self.path = path
+        self.ttl = {**DEFAULT_TTL, **(ttl or {})}
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, endpoint TEXT, body BLOB, status INTEGER, '
+            'created REAL, accessed REAL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+        self.conn.commit()
+
+    def get(self, key, endpoint):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT body, status, created FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or now - row[2] > self.ttl.get(endpoint, 0):
+                if row is not None:
+                    self.conn.execute('DELETE FROM responses WHERE key = ?', (key,))
+                    self.conn.commit()
+                self.misses += 1
+                return None
+            self.conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self.conn.commit()
+            self.hits += 1
+        return CachedResponse(row[0], row[1])
+
+    def set(self, key, endpoint, body, status=200):
+        if self.ttl.get(endpoint, 0) <= 0:
+            return
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses (key, endpoint, body, status, created, accessed) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, endpoint, body, status, now, now),
+            )
+            self.evict()
+            self.conn.commit()
+
+    def evict(self):
+        count = self.conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                'DELETE FROM responses WHERE key IN ('
+                'SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)',
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute('DELETE FROM responses')
+            self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            size = self.conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'size': size}
+
+    def close(self):
+        self.conn.close()
+
+    def __repr__(self):
+        return f"<ResponseCache path={self.path!r} hits={self.hits} misses={self.misses}>"
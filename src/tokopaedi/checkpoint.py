@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import parse_qsl
+
+def search_key(keyword, base_param):
+    # Journal key of one search: the keyword plus a digest of its request
+    # params (filters included), so the same keyword crawled with other
+    # filters or base params keeps a cursor of its own
+    params = sorted(parse_qsl(base_param or '', keep_blank_values=True))
+    digest = hashlib.sha1(json.dumps(params).encode('utf-8')).hexdigest()[:16]
+    return f'{keyword}:{digest}'
+
+class CrawlJournal:
+    # Append-only JSON Lines progress journal for resumable crawls.
+    #
+    # search_iter records, per search (see search_key), every page it
+    # finished (the additionalParams cursor for the next page, the product IDs
+    # it yielded and the running result count) and marks the search done once
+    # pagination ends. enrich records each product ID it finished. Re-opening the same
+    # file replays it, so a restarted crawl continues from the last cursor and
+    # skips products that were already enriched.
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.cursors = {}
+        self.counts = {}
+        self.seen = {}
+        self.finished = set()
+        self.enriched = set()
+        self.lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.replay(json.loads(line))
+                    except (ValueError, KeyError):
+                        # a torn final line from a crash mid-write, or a
+                        # search entry keyed by bare keyword (older journals)
+                        continue
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def replay(self, entry):
+        event = entry.get('event')
+        if event == 'page':
+            key = entry['key']
+            self.cursors[key] = entry['cursor']
+            self.counts[key] = entry['count']
+            self.seen.setdefault(key, set()).update(entry['product_ids'])
+        elif event == 'search_done':
+            self.finished.add(entry['key'])
+        elif event == 'enriched':
+            self.enriched.add(str(entry['product_id']))
+
+    def write(self, entry):
+        with self.lock:
+            self.replay(entry)
+            self.file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+
+    def record_page(self, key, cursor, product_ids, count):
+        self.write({
+            'event': 'page',
+            'key': key,
+            'cursor': cursor,
+            'product_ids': list(product_ids),
+            'count': count,
+        })
+
+    def record_search_done(self, key):
+        self.write({'event': 'search_done', 'key': key})
+
+    def record_enriched(self, product_id):
+        self.write({'event': 'enriched', 'product_id': str(product_id)})
+
+    def cursor(self, key):
+        return self.cursors.get(key)
+
+    def result_count(self, key):
+        return self.counts.get(key, 0)
+
+    def seen_ids(self, key):
+        return set(self.seen.get(key, ()))
+
+    def is_search_done(self, key):
+        return key in self.finished
+
+    def is_enriched(self, product_id):
+        return str(product_id) in self.enriched
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"<CrawlJournal path={self.path!r} searches={len(self.cursors)} enriched={len(self.enriched)}>"
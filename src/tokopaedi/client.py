@@ -0,0 +1,299 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from contextlib import nullcontext
+from urllib.parse import parse_qs
+from curl_cffi import requests, CurlOpt, CurlError
+from .cache import cache_key
+from .rate_limit import RetryPolicy
+from .get_fingerprint import randomize_fp
+from .tracing import span, current_span
+
+BASE_URL = 'https://gql.tokopedia.com'
+
+def resolve_base_url(base_url=None):
+    # Explicit argument, then TOKOPAEDI_BASE_URL (e.g. a local fake server),
+    # then the real endpoint
+    return (base_url or os.environ.get('TOKOPAEDI_BASE_URL') or BASE_URL).rstrip('/')
+
+SPAN_NAMES = {'search': 'search.page', 'product': 'product', 'reviews': 'reviews.page'}
+
+def span_attributes(endpoint, json_data):
+    if isinstance(json_data, list):
+        return {'endpoint': endpoint, 'batch_size': len(json_data)}
+    variables = json_data.get('variables') or {}
+    if endpoint == 'search':
+        params = parse_qs(variables.get('params', ''))
+        return {'endpoint': endpoint, 'keyword': params.get('q', [None])[0], 'page': params.get('page', [None])[0]}
+    if endpoint == 'product':
+        return {'endpoint': endpoint, 'product_id': variables.get('productId') or variables.get('productKey')}
+    if endpoint == 'reviews':
+        return {'endpoint': endpoint, 'product_id': variables.get('productID'), 'page': variables.get('page')}
+    return {'endpoint': endpoint}
+
+def lease_fingerprint(pool):
+    return pool.lease() if pool else nullcontext(randomize_fp())
+
+def request_headers(headers, fingerprint, base_url):
+    headers = {**headers, 'Fingerprint-Data': fingerprint}
+    if base_url != BASE_URL:
+        # the endpoint headers pin Host to gql.tokopedia.com; let curl derive
+        # it from the URL when talking to anything else
+        headers.pop('Host', None)
+    return headers
+
+class TokopaediClient:
+    # One curl_cffi Session shared by search, get_product and get_reviews.
+    # Connections are kept alive between calls, so repeated requests to
+    # gql.tokopedia.com reuse the TLS session instead of handshaking again.
+    # pool_size caps how many idle connections curl keeps cached per handle.
+    # cache is an optional ResponseCache consulted before hitting the network,
+    # rate_limiter an optional RateLimiter shared by all endpoints, and retry
+    # the RetryPolicy applied to 429/5xx responses and transport errors.
+    # With a FingerprintPool, each request in flight leases one of its slots
+    # and sends that slot's pre-generated Fingerprint-Data header; without
+    # one every request gets a fresh one.
+    # base_url overrides where requests go (see resolve_base_url), and
+    # metrics is an optional MetricsHook told about every request.
+    def __init__(self, pool_size=10, timeout=30, proxy=None, verify=False, cache=None,
+                 rate_limiter=None, retry=None, fingerprints=None, base_url=None, metrics=None):
+        self.pool_size = pool_size
+        self.metrics = metrics
+        self.base_url = resolve_base_url(base_url)
+        self.fingerprints = fingerprints
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.timeout = timeout
+        self.proxy = proxy
+        self.verify = verify
+        self.session = requests.Session(
+            timeout=timeout,
+            proxy=proxy,
+            verify=verify,
+            curl_options={CurlOpt.MAXCONNECTS: pool_size},
+        )
+
+    def post(self, path, headers, json_data, endpoint=None):
+        with span(SPAN_NAMES.get(endpoint, 'request'), **span_attributes(endpoint, json_data)) as request_span:
+            key = None
+            if self.cache is not None and endpoint:
+                key = cache_key(endpoint, json_data)
+                cached = self.cache.get(key, endpoint)
+                if cached is not None:
+                    if self.metrics:
+                        self.metrics.on_request(endpoint, cached.status_code, 0.0, len(cached.content), 0, from_cache=True)
+                    request_span.set_attributes(cache_hit=True, status=cached.status_code, bytes=len(cached.content))
+                    return cached
+
+            response = self.send(path, headers, json_data, endpoint)
+            request_span.set_attributes(cache_hit=False, status=response.status_code, bytes=len(response.content))
+            if key and response.status_code == 200:
+                # stored once the fetcher has decoded it (cache.store_decoded)
+                response.pending_cache_key = key
+            return response
+
+    def send(self, path, headers, json_data, endpoint=None):
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire(endpoint)
+
+            response = None
+            start = time.perf_counter()
+            try:
+                with lease_fingerprint(self.fingerprints) as fingerprint:
+                    response = self.session.post(
+                        self.base_url + path,
+                        headers=request_headers(headers, fingerprint, self.base_url),
+                        json=json_data,
+                    )
+            except CurlError:
+                if self.metrics:
+                    self.metrics.on_request(endpoint, 'error', time.perf_counter() - start, 0, attempt)
+                if self.rate_limiter:
+                    self.rate_limiter.record(endpoint, False)
+                if attempt >= self.retry.max_retries:
+                    raise
+            else:
+                if self.metrics:
+                    self.metrics.on_request(endpoint, response.status_code, time.perf_counter() - start,
+                                            len(response.content), attempt)
+                if self.fingerprints:
+                    self.fingerprints.record(fingerprint, response.status_code)
+                ok = not self.retry.should_retry(response.status_code)
+                if self.rate_limiter:
+                    self.rate_limiter.record(endpoint, ok)
+                if ok or attempt >= self.retry.max_retries:
+                    current_span().set_attribute('attempts', attempt + 1)
+                    return response
+
+            time.sleep(self.retry.delay(attempt, response))
+            attempt += 1
+
+    def search(self, *args, **kwargs):
+        from .search import search
+        return search(*args, client=self, **kwargs)
+
+    def get_product(self, *args, **kwargs):
+        from .get_product import get_product
+        return get_product(*args, client=self, **kwargs)
+
+    def get_reviews(self, *args, **kwargs):
+        from .get_reviews import get_reviews
+        return get_reviews(*args, client=self, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"<TokopaediClient base_url={self.base_url!r} pool_size={self.pool_size}>"
+
+class AsyncTokopaediClient:
+    # asyncio counterpart of TokopaediClient built on curl_cffi's AsyncSession.
+    # concurrency bounds the number of requests in flight at once, pool_size
+    # the number of curl handles (and therefore open connections) kept around.
+    def __init__(self, pool_size=10, concurrency=10, timeout=30, proxy=None, verify=False, cache=None,
+                 rate_limiter=None, retry=None, fingerprints=None, base_url=None, metrics=None):
+        self.pool_size = pool_size
+        self.metrics = metrics
+        self.base_url = resolve_base_url(base_url)
+        self.fingerprints = fingerprints
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.proxy = proxy
+        self.verify = verify
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = requests.AsyncSession(
+            max_clients=pool_size,
+            timeout=timeout,
+            proxy=proxy,
+            verify=verify,
+        )
+
+    async def post(self, path, headers, json_data, endpoint=None):
+        with span(SPAN_NAMES.get(endpoint, 'request'), **span_attributes(endpoint, json_data)) as request_span:
+            key = None
+            if self.cache is not None and endpoint:
+                key = cache_key(endpoint, json_data)
+                cached = self.cache.get(key, endpoint)
+                if cached is not None:
+                    if self.metrics:
+                        self.metrics.on_request(endpoint, cached.status_code, 0.0, len(cached.content), 0, from_cache=True)
+                    request_span.set_attributes(cache_hit=True, status=cached.status_code, bytes=len(cached.content))
+                    return cached
+
+            response = await self.send(path, headers, json_data, endpoint)
+            request_span.set_attributes(cache_hit=False, status=response.status_code, bytes=len(response.content))
+            if key and response.status_code == 200:
+                # stored once the fetcher has decoded it (cache.store_decoded)
+                response.pending_cache_key = key
+            return response
+
+    async def send(self, path, headers, json_data, endpoint=None):
+        attempt = 0
+        while True:
+            if self.rate_limiter:
+                delay = self.rate_limiter.reserve(endpoint)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            response = None
+            start = time.perf_counter()
+            try:
+                # lease inside the semaphore, so only requests actually in
+                # flight hold a fingerprint slot
+                async with self.semaphore:
+                    with lease_fingerprint(self.fingerprints) as fingerprint:
+                        # time the request, not the wait for a free slot
+                        start = time.perf_counter()
+                        response = await self.session.post(
+                            self.base_url + path,
+                            headers=request_headers(headers, fingerprint, self.base_url),
+                            json=json_data,
+                        )
+            except CurlError:
+                if self.metrics:
+                    self.metrics.on_request(endpoint, 'error', time.perf_counter() - start, 0, attempt)
+                if self.rate_limiter:
+                    self.rate_limiter.record(endpoint, False)
+                if attempt >= self.retry.max_retries:
+                    raise
+            else:
+                if self.metrics:
+                    self.metrics.on_request(endpoint, response.status_code, time.perf_counter() - start,
+                                            len(response.content), attempt)
+                if self.fingerprints:
+                    self.fingerprints.record(fingerprint, response.status_code)
+                ok = not self.retry.should_retry(response.status_code)
+                if self.rate_limiter:
+                    self.rate_limiter.record(endpoint, ok)
+                if ok or attempt >= self.retry.max_retries:
+                    current_span().set_attribute('attempts', attempt + 1)
+                    return response
+
+            await asyncio.sleep(self.retry.delay(attempt, response))
+            attempt += 1
+
+    async def search(self, *args, **kwargs):
+        from .search import async_search
+        return await async_search(*args, client=self, **kwargs)
+
+    async def get_product(self, *args, **kwargs):
+        from .get_product import async_get_product
+        return await async_get_product(*args, client=self, **kwargs)
+
+    async def get_reviews(self, *args, **kwargs):
+        from .get_reviews import async_get_reviews
+        return await async_get_reviews(*args, client=self, **kwargs)
+
+    async def close(self):
+        await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def __repr__(self):
+        return f"<AsyncTokopaediClient pool_size={self.pool_size} concurrency={self.concurrency}>"
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_default_client():
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = TokopaediClient()
+    return _default_client
+
+def set_default_client(client):
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
+
+# AsyncSession is tied to the event loop it was created on, so the default
+# async client is kept per running loop.
+_default_async_clients = weakref.WeakKeyDictionary()
+
+def get_default_async_client():
+    loop = asyncio.get_running_loop()
+    client = _default_async_clients.get(loop)
+    if client is None:
+        client = AsyncTokopaediClient()
+        _default_async_clients[loop] = client
+    return client
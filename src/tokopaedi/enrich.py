@@ -0,0 +1,88 @@
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+from .tokopaedi_types import SearchResults
+from .get_product import get_product
+from .get_reviews import get_reviews, clamp_page_size
+from .client import get_default_client
+from .tracing import span, submit
+
+def enrich_one(result, details=True, reviews=20, debug=False, client=None):
+    with span('enrich', product_id=result.product_id):
+        if details:
+            result.product_detail = get_product(product_id=result.product_id, debug=debug, client=client)
+        if reviews:
+            result.product_reviews = get_reviews(
+                product_id=result.product_id,
+                max_result=reviews,
+                page_size=clamp_page_size(reviews),
+                # enrich already runs products in parallel; one page at a
+                # time keeps the requests in flight bounded by its workers
+                workers=1,
+                debug=debug,
+                client=client
+            )
+    return result
+
+def enriched_ok(result, details, reviews):
+    if details and result.product_detail is None:
+        return False
+    if reviews and result.product_reviews is None:
+        return False
+    return True
+
+def enrich(results, details=True, reviews=20, workers=8, progress=None, debug=False, client=None, journal=None, sink=None):
+    # Fetch product details and/or reviews for every search result concurrently
+    # and attach them in place. `reviews` is the max review count per product
+    # (0 or None to skip). `progress(done, total, result)` is called from the
+    # calling thread each time an item finishes, in completion order; total is
+    # None when results is a stream such as search_iter().
+    # Work is submitted as items arrive, so enrich(search_iter(...)) starts on
+    # the first page while later pages are still being fetched. Returns the
+    # items as a SearchResults (the same object when one was passed in).
+    # With a CrawlJournal, products already enriched in an earlier run are
+    # skipped and each finished product is recorded. With a JsonlSink, each
+    # product is written out the moment it finishes.
+    client = client or get_default_client()
+    total = None
+    if hasattr(results, '__len__'):
+        total = sum(1 for item in results if not (journal and journal.is_enriched(item.product_id)))
+    items = []
+    done = 0
+
+    def settle(future, item):
+        nonlocal done
+        done += 1
+        try:
+            future.result()
+        except Exception:
+            print(traceback.format_exc())
+        else:
+            if sink:
+                sink.write(item)
+            if journal and enriched_ok(item, details, reviews):
+                journal.record_enriched(item.product_id)
+        if progress:
+            progress(done, total, item)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        try:
+            for item in results:
+                items.append(item)
+                if journal and journal.is_enriched(item.product_id):
+                    continue
+                running[submit(executor, enrich_one, item, details, reviews, debug, client)] = item
+                # a couple of items queued per worker keeps them busy without
+                # buffering a whole search in futures
+                while len(running) >= workers * 2:
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        settle(future, running.pop(future))
+        finally:
+            # also when the input stream raises (e.g. a failed search page),
+            # so products already fetched still reach the sink and journal
+            for future in as_completed(running):
+                settle(future, running[future])
+
+    return results if isinstance(results, SearchResults) else SearchResults(items)
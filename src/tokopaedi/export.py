@@ -0,0 +1,217 @@
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+TABLES = ('products', 'shops', 'variants', 'media', 'reviews')
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet export needs pyarrow: pip install tokopaedi[parquet]")
+
+def to_int(value):
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def to_float(value):
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def as_dict(item):
+    return item.json() if hasattr(item, 'json') else item
+
+def schemas():
+    require_pyarrow()
+    return {
+        'products': pa.schema([
+            ('product_id', pa.int64()),
+            ('product_sku', pa.string()),
+            ('name', pa.string()),
+            ('category', pa.string()),
+            ('url', pa.string()),
+            ('sold_count', pa.int64()),
+            ('original_price', pa.string()),
+            ('real_price', pa.int64()),
+            ('real_price_text', pa.string()),
+            ('rating', pa.float64()),
+            ('image', pa.string()),
+            ('shop_id', pa.int64()),
+            ('product_status', pa.string()),
+            ('product_price', pa.int64()),
+            ('product_price_original', pa.string()),
+            ('product_discount_percentage', pa.string()),
+            ('weight', pa.int64()),
+            ('weight_unit', pa.string()),
+            ('review_count', pa.int64()),
+            ('discussion_count', pa.int64()),
+            ('total_stock', pa.int64()),
+            ('etalase', pa.string()),
+            ('etalase_url', pa.string()),
+            ('detail_category', pa.string()),
+            ('sub_category', pa.list_(pa.string())),
+        ]),
+        'shops': pa.schema([
+            ('shop_id', pa.int64()),
+            ('name', pa.string()),
+            ('city', pa.string()),
+            ('url', pa.string()),
+            ('is_official', pa.bool_()),
+            ('location', pa.string()),
+        ]),
+        'variants': pa.schema([
+            ('product_id', pa.int64()),
+            ('option_ids', pa.list_(pa.int64())),
+            ('option_name', pa.string()),
+            ('option_url', pa.string()),
+            ('price', pa.int64()),
+            ('price_string', pa.string()),
+            ('discount', pa.string()),
+            ('image_url', pa.string()),
+            ('stock', pa.int64()),
+        ]),
+        'media': pa.schema([
+            ('product_id', pa.int64()),
+            ('position', pa.int32()),
+            ('original', pa.string()),
+            ('thumbnail', pa.string()),
+            ('max_res', pa.string()),
+        ]),
+        'reviews': pa.schema([
+            ('product_id', pa.int64()),
+            ('feedback_id', pa.int64()),
+            ('variant_name', pa.string()),
+            ('message', pa.string()),
+            ('rating', pa.float64()),
+            ('review_age', pa.string()),
+            ('user_full_name', pa.string()),
+            ('user_url', pa.string()),
+            ('response_message', pa.string()),
+            ('response_created_text', pa.string()),
+            ('images', pa.list_(pa.string())),
+            ('videos', pa.list_(pa.string())),
+            ('likes', pa.int64()),
+        ]),
+    }
+
+def to_arrow_tables(results):
+    # Flattens SearchResults (or ProductSearchResult objects / their .json()
+    # dicts, e.g. a reloaded output.json) into normalized Arrow tables linked
+    # by product_id / shop_id: products, shops, variants, media and reviews.
+    table_schemas = schemas()
+    rows = {name: [] for name in TABLES}
+    shops = {}
+
+    for item in results:
+        item = as_dict(item)
+        product_id = to_int(item.get('product_id'))
+        shop = item.get('shop') or {}
+        detail = item.get('product_detail') or {}
+        shop_id = to_int(shop.get('shop_id')) or to_int(detail.get('shop_id'))
+
+        rows['products'].append({
+            'product_id': product_id,
+            'product_sku': None if item.get('product_sku') is None else str(item.get('product_sku')),
+            'name': item.get('name'),
+            'category': item.get('category'),
+            'url': item.get('url'),
+            'sold_count': to_int(detail.get('sold_count', item.get('sold_count'))),
+            'original_price': item.get('original_price'),
+            'real_price': to_int(item.get('real_price')),
+            'real_price_text': item.get('real_price_text'),
+            'rating': to_float(detail.get('rating', item.get('rating'))),
+            'image': item.get('image'),
+            'shop_id': shop_id,
+            'product_status': detail.get('product_status'),
+            'product_price': to_int(detail.get('product_price')),
+            'product_price_original': detail.get('product_price_original'),
+            'product_discount_percentage': detail.get('product_discount_percentage'),
+            'weight': to_int(detail.get('weight')),
+            'weight_unit': detail.get('weight_unit'),
+            'review_count': to_int(detail.get('review_count')),
+            'discussion_count': to_int(detail.get('discussion_count')),
+            'total_stock': to_int(detail.get('total_stock')),
+            'etalase': detail.get('etalase'),
+            'etalase_url': detail.get('etalase_url'),
+            'detail_category': detail.get('category'),
+            'sub_category': detail.get('sub_category'),
+        })
+
+        if shop_id is not None and shop_id not in shops:
+            shops[shop_id] = {
+                'shop_id': shop_id,
+                'name': shop.get('name') or detail.get('shop_name'),
+                'city': shop.get('city'),
+                'url': shop.get('url'),
+                'is_official': shop.get('is_official'),
+                'location': detail.get('shop_location'),
+            }
+
+        for variant in detail.get('variants') or []:
+            rows['variants'].append({
+                'product_id': product_id,
+                'option_ids': [to_int(x) for x in variant.get('option_ids') or []],
+                'option_name': variant.get('option_name'),
+                'option_url': variant.get('option_url'),
+                'price': to_int(variant.get('price')),
+                'price_string': variant.get('price_string'),
+                'discount': variant.get('discount'),
+                'image_url': variant.get('image_url'),
+                'stock': to_int(variant.get('stock')),
+            })
+
+        for position, media in enumerate(detail.get('product_media') or []):
+            rows['media'].append({
+                'product_id': product_id,
+                'position': position,
+                'original': media.get('original'),
+                'thumbnail': media.get('thumbnail'),
+                'max_res': media.get('max_res'),
+            })
+
+        for review in item.get('product_reviews') or []:
+            rows['reviews'].append({
+                'product_id': product_id,
+                'feedback_id': to_int(review.get('feedback_id')),
+                'variant_name': review.get('variant_name'),
+                'message': review.get('message'),
+                'rating': to_float(review.get('rating')),
+                'review_age': None if review.get('review_age') is None else str(review.get('review_age')),
+                'user_full_name': review.get('user_full_name'),
+                'user_url': review.get('user_url'),
+                'response_message': review.get('response_message'),
+                'response_created_text': review.get('response_created_text'),
+                'images': review.get('images') or [],
+                'videos': [
+                    v.get('videoUrl', '') if isinstance(v, dict) else str(v)
+                    for v in review.get('videos') or []
+                ],
+                'likes': to_int(review.get('likes')),
+            })
+
+    rows['shops'] = list(shops.values())
+    return {
+        name: pa.Table.from_pylist(rows[name], schema=table_schemas[name])
+        for name in TABLES
+    }
+
+def to_parquet(results, directory, compression='zstd'):
+    # Writes <directory>/<table>.parquet for every table and returns the paths
+    tables = to_arrow_tables(results)
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, table in tables.items():
+        paths[name] = os.path.join(directory, f'{name}.parquet')
+        pq.write_table(table, paths[name], compression=compression)
+    return paths
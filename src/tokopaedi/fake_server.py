@@ -0,0 +1,309 @@
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from .fast_json import dumps, loads
+from .get_product import PDP_PATH, parse_tokped_url
+from .get_reviews import REVIEWS_PATH
+from .search import SEARCH_PATH
+
+# Local stand-in for the three gql.tokopedia.com operations the library uses,
+# for load-testing concurrency, retries and caching offline. It serves a
+# catalogue of recorded results (the SearchResults.json() format, e.g.
+# output.json) rebuilt into the GraphQL response shapes the extractors read.
+#
+#   python -m tokopaedi.fake_server --data output.json --latency 0.05 --throttle-rate 0.1
+#   TOKOPAEDI_BASE_URL=http://127.0.0.1:8321 python example.py
+
+ENDPOINTS = {SEARCH_PATH: 'search', PDP_PATH: 'product', REVIEWS_PATH: 'reviews'}
+
+def search_product_payload(item):
+    shop = item.get('shop') or {}
+    badge = {'title': 'Official Store', 'url': 'https://images.tokopedia.net/img/official_store_badge.png'} \
+        if shop.get('is_official') else None
+    return {
+        'id': item.get('product_id'),
+        'name': item.get('name'),
+        'url': item.get('url'),
+        'mediaURL': {'image700': item.get('image')},
+        'shop': {'id': shop.get('shop_id'), 'name': shop.get('name'), 'url': shop.get('url'), 'city': shop.get('city')},
+        'badge': badge,
+        'price': {'text': item.get('real_price_text'), 'number': item.get('real_price'), 'original': item.get('original_price')},
+        'category': {'name': item.get('category')},
+        'rating': str(item.get('rating') or ''),
+        'stock': {'sold': item.get('sold_count'), 'ttsSKUID': item.get('product_sku')},
+    }
+
+def pdp_payload(item):
+    detail = item.get('product_detail') or {}
+    return {
+        'basicInfo': {
+            'productID': str(detail.get('product_id', item.get('product_id'))),
+            'url': detail.get('url', item.get('url')),
+            'status': detail.get('product_status'),
+            'weight': detail.get('weight'),
+            'weightUnit': detail.get('weight_unit'),
+            'txStats': {'countSold': str(detail.get('sold_count', 0))},
+            'stats': {
+                'rating': detail.get('rating'),
+                'countReview': str(detail.get('review_count', 0)),
+                'countTalk': str(detail.get('discussion_count', 0)),
+            },
+            'totalStockFmt': str(detail.get('total_stock', 0)),
+            'menu': {'name': detail.get('etalase'), 'url': detail.get('etalase_url')},
+            'category': {'name': detail.get('category'), 'detail': [{'name': name} for name in detail.get('sub_category') or []]},
+            'shopID': str(detail.get('shop_id', 0)),
+            'shopName': detail.get('shop_name'),
+            'shopMultilocation': {'cityName': detail.get('shop_location')},
+        },
+        'components': [
+            {'name': 'product_content', 'type': 'product', 'data': [{
+                'name': detail.get('product_name', item.get('name')),
+                'price': {
+                    'value': detail.get('product_price'),
+                    'priceFmt': detail.get('product_price_text'),
+                    'slashPriceFmt': detail.get('product_price_original'),
+                    'discPercentage': detail.get('product_discount_percentage'),
+                },
+            }]},
+            {'name': 'product_media', 'type': 'product_media', 'data': [{'media': [
+                {'URLOriginal': m.get('original'), 'URLThumbnail': m.get('thumbnail'), 'URLMaxRes': m.get('max_res')}
+                for m in detail.get('product_media') or []
+            ]}]},
+            {'name': 'mini_variant_options', 'type': 'mini_variant_options', 'data': [{
+                'variants': [
+                    {'productVariantID': str(o.get('option_id')), 'name': o.get('option_name'),
+                     'option': [{'value': value} for value in o.get('option_child') or []]}
+                    for o in detail.get('product_option') or []
+                ],
+                'children': [
+                    {'optionID': v.get('option_ids'), 'productName': v.get('option_name'), 'productURL': v.get('option_url'),
+                     'price': v.get('price'), 'priceFmt': v.get('price_string'), 'discPercentage': v.get('discount'),
+                     'picture': {'url': v.get('image_url')}, 'stock': {'stock': v.get('stock')}}
+                    for v in detail.get('variants') or []
+                ],
+            }]},
+        ],
+    }
+
+def review_payload(review):
+    return {
+        'feedbackID': str(review.get('feedback_id')),
+        'variantName': review.get('variant_name'),
+        'message': review.get('message'),
+        'productRating': review.get('rating'),
+        'reviewCreateTimestamp': review.get('review_age'),
+        'reviewResponse': {'message': review.get('response_message'), 'createTime': review.get('response_created_text')},
+        'user': {'fullName': review.get('user_full_name'), 'url': review.get('user_url')},
+        'imageAttachments': [{'imageUrl': url} for url in review.get('images') or []],
+        'videoAttachments': review.get('videos') or [],
+        'likeDislike': {'totalLike': review.get('likes')},
+    }
+
+class FakeTokopedia:
+    # The request handling behind FakeGraphQLServer, usable without sockets.
+    # latency (+ uniform jitter) seconds are slept before every answer;
+    # throttle_rate and error_rate are the chances of answering 429 (with
+    # Retry-After: 0) or 500 instead. max_pages caps search pagination like
+    # the real endpoint does: deeper pages come back empty while totalData
+    # still reports every match.
+    def __init__(self, catalog, page_size=20, latency=0.0, jitter=0.0, error_rate=0.0,
+                 throttle_rate=0.0, seed=None, max_pages=None):
+        self.catalog = [item for item in catalog if item.get('product_id') is not None]
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+        self.by_id = {}
+        self.by_key = {}
+        for item in self.catalog:
+            self.by_id[str(item['product_id'])] = item
+            url = (item.get('product_detail') or {}).get('url') or item.get('url') or ''
+            if 'tokopedia.com/' in url:
+                self.by_key[parse_tokped_url(url)] = item
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, 'rb') as f:
+            return cls(loads(f.read()), **kwargs)
+
+    def fault(self):
+        with self.lock:
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return None
+
+    def handle(self, path, body):
+        # Returns (status, body bytes, extra headers)
+        endpoint = ENDPOINTS.get(path)
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        if endpoint is None:
+            status, payload, headers = 404, {'errors': [{'message': f'unknown path {path}'}]}, {}
+        elif (status := self.fault()) is not None:
+            payload = {'errors': [{'message': 'injected fault'}]}
+            headers = {'Retry-After': '0'} if status == 429 else {}
+        else:
+            operations = loads(body)
+            if isinstance(operations, list):
+                payload = [self.respond(endpoint, op) for op in operations]
+            else:
+                payload = self.respond(endpoint, operations)
+            status, headers = 200, {}
+
+        with self.lock:
+            self.stats[(endpoint, status)] += 1
+        return status, dumps(payload), headers
+
+    def respond(self, endpoint, operation):
+        payload = getattr(self, endpoint)(operation.get('variables') or {})
+        if endpoint == 'search' and 'totalData' not in (operation.get('query') or ''):
+            # like the real server, fields the query did not select are absent
+            del payload['data']['searchProductV5']['header']['totalData']
+        return payload
+
+    def search(self, variables):
+        params = {k: v[0] for k, v in parse_qs(variables.get('params', '')).items()}
+        page = int(params.get('page', 1))
+        tokens = params.get('q', '').lower().split()
+        pmin = int(params.get('pmin') or 0)
+        pmax = int(params.get('pmax') or 0) or None
+
+        matching = [item for item in self.catalog if all(t in (item.get('name') or '').lower() for t in tokens)]
+        # unknown keywords still get the whole catalogue so any crawl paginates
+        matching = matching or self.catalog
+        matching = [
+            item for item in matching
+            if pmin <= (item.get('real_price') or 0) and (pmax is None or (item.get('real_price') or 0) <= pmax)
+        ]
+
+        start = (page - 1) * self.page_size
+        products = matching[start:start + self.page_size]
+        has_next = start + self.page_size < len(matching)
+        if self.max_pages is not None:
+            products = products if page <= self.max_pages else []
+            has_next = has_next and page < self.max_pages
+        return {'data': {'searchProductV5': {
+            'header': {
+                'totalData': len(matching),
+                'additionalParams': f'page={page + 1}&start={start + self.page_size}' if has_next else '',
+            },
+            'data': {'products': [search_product_payload(item) for item in products]},
+        }}}
+
+    def product(self, variables):
+        item = self.by_id.get(str(variables.get('productId') or ''))
+        if item is None:
+            item = self.by_key.get((variables.get('shopDomain') or '', variables.get('productKey') or ''))
+        if item is None or not item.get('product_detail'):
+            return {'data': {'pdpGetLayout': None}, 'errors': [{'message': 'product not found'}]}
+        return {'data': {'pdpGetLayout': pdp_payload(item)}}
+
+    def reviews(self, variables):
+        item = self.by_id.get(str(variables.get('productID')))
+        reviews = (item or {}).get('product_reviews') or []
+        page = int(variables.get('page', 1))
+        limit = int(variables.get('limit', 10))
+        start = (page - 1) * limit
+        return {'data': {'productrevGetProductReviewList': {
+            'list': [review_payload(review) for review in reviews[start:start + limit]],
+            'hasNext': start + limit < len(reviews),
+        }}}
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out as separate writes; with Nagle on, keep-alive
+    # clients stall on delayed ACKs for ~40ms per response
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        status, content, headers = self.server.app.handle(self.path.split('?')[0], body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeGraphQLServer(ThreadingHTTPServer):
+    # Threaded HTTP server around a FakeTokopedia. port=0 picks a free port;
+    # point a client at it with TokopaediClient(base_url=server.base_url) or
+    # the TOKOPAEDI_BASE_URL environment variable.
+    daemon_threads = True
+
+    def __init__(self, app, host='127.0.0.1', port=0):
+        super().__init__((host, port), FakeHandler)
+        self.app = app
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local stand-in for the Tokopedia GraphQL endpoints')
+    parser.add_argument('--data', default='output.json', help='recorded results (SearchResults JSON)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8321)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, help='extra uniform random latency, seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with 500')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of requests answered with 429')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--max-pages', type=int, default=None, help='deepest search page served')
+    args = parser.parse_args(argv)
+
+    app = FakeTokopedia.from_file(
+        args.data, page_size=args.page_size, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, seed=args.seed, max_pages=args.max_pages,
+    )
+    server = FakeGraphQLServer(app, args.host, args.port)
+    print(f'Serving {len(app.catalog)} products on {server.base_url}')
+    print(f'export TOKOPAEDI_BASE_URL={server.base_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
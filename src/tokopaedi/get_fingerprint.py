@@ -1,4 +1,6 @@
 import random
+import threading
+from contextlib import contextmanager
 import uuid
 import json
 import base64
@@ -62,4 +64,89 @@ def randomize_fp():
     json_str = json.dumps(fingerprint)
     b64_str = base64.b64encode(json_str.encode("utf-8")).decode("utf-8")
 
-    return b64_str
\ No newline at end of file
+    return b64_str
+
+
+# Responses that mean the identity is being throttled or blocked
+BLOCK_STATUSES = (403, 429)
+
+class Fingerprint:
+    __slots__ = ('value', 'ok', 'blocked', 'retired')
+
+    def __init__(self, value):
+        self.value = value
+        self.ok = 0
+        self.blocked = 0
+        self.retired = False
+
+    @property
+    def block_rate(self):
+        total = self.ok + self.blocked
+        return self.blocked / total if total else 0.0
+
+class FingerprintPool:
+    # Pre-generates `size` encoded fingerprints so requests don't rebuild and
+    # base64-encode one each time. A request leases one of the `size` slots
+    # for as long as it is in flight, always the least busy one (lowest index
+    # on a tie), so a serial crawl keeps sending slot 0 and k concurrent
+    # workers settle on slots 0..k-1 however their threads or tasks come and
+    # go. Every response is recorded against the fingerprint that sent it;
+    # once one has seen min_requests responses with a block rate (403/429)
+    # above max_block_rate it is retired and its slot gets a fresh one.
+    def __init__(self, size=16, max_block_rate=0.2, min_requests=20, generator=randomize_fp):
+        self.size = size
+        self.max_block_rate = max_block_rate
+        self.min_requests = min_requests
+        self.generator = generator
+        self.entries = [Fingerprint(generator()) for _ in range(size)]
+        self.by_value = {entry.value: entry for entry in self.entries}
+        self.in_use = [0] * size
+        self.retired = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def lease(self):
+        with self.lock:
+            index = min(range(self.size), key=lambda i: (self.in_use[i], i))
+            self.in_use[index] += 1
+            value = self.entries[index].value
+        try:
+            yield value
+        finally:
+            with self.lock:
+                self.in_use[index] -= 1
+
+    def record(self, value, status_code):
+        with self.lock:
+            entry = self.by_value.get(value)
+            if entry is None:
+                return
+            if status_code in BLOCK_STATUSES:
+                entry.blocked += 1
+            else:
+                entry.ok += 1
+            if entry.ok + entry.blocked >= self.min_requests and entry.block_rate > self.max_block_rate:
+                self.retire(entry)
+
+    def retire(self, entry):
+        entry.retired = True
+        del self.by_value[entry.value]
+        fresh = Fingerprint(self.generator())
+        self.entries[self.entries.index(entry)] = fresh
+        self.by_value[fresh.value] = fresh
+        self.retired += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'size': self.size,
+                'retired': self.retired,
+                'in_use': sum(self.in_use),
+                'fingerprints': [
+                    {'ok': entry.ok, 'blocked': entry.blocked, 'block_rate': entry.block_rate}
+                    for entry in self.entries
+                ],
+            }
+
+    def __repr__(self):
+        return f"<FingerprintPool size={self.size} retired={self.retired}>"
@@ -1,30 +1,21 @@
-from curl_cffi import requests
 import logging
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import json
-from .tokopaedi_types import ProductData, ProductMedia, ProductOption, ProductVariant
+from dataclasses import fields
+from .tokopaedi_types import ProductData, ProductMedia, ProductOption, ProductVariant, ProductOutcome
 from .custom_logging import setup_custom_logging
-from .get_fingerprint import randomize_fp
+from .client import get_default_client, get_default_async_client
+from .fast_json import loads
+from .metrics import timed_decode, timed_extract
+from .tracing import submit
+from .query_profiles import product_query
 
 logger = setup_custom_logging()
 
-def product_details_extractor(json_data):
-    pdp = json_data.get("data", {}).get("pdpGetLayout", {})
-    components = pdp.get("components", [])
-
-    def find_component(name):
-        for c in components:
-            if c.get("name") == name:
-                return c.get("data", [])
-        return []
-
-    product_content = find_component("product_content")
-    product_content = product_content[0] if product_content else {}
-    product_media_raw = find_component("product_media")
-    product_media_raw = product_media_raw[0].get("media", []) if product_media_raw else []
-    basic_info = pdp.get("basicInfo", {})
-
-    product_media = [
+def extract_media(product_media_raw):
+    return [
         ProductMedia(
             original=media.get("URLOriginal", ""),
             thumbnail=media.get("URLThumbnail", ""),
@@ -33,82 +24,206 @@ def product_details_extractor(json_data):
         for media in product_media_raw
     ]
 
+def extract_options(mini_variant):
     product_option = []
+    for option in mini_variant.get('variants') or []:
+        option_id = int(option.get('productVariantID', 0) or 0)
+        option_name = option.get('name', '')
+        option_child = [x.get('value', '') for x in option.get('option') or []]
+        product_option.append(ProductOption(
+            option_id=option_id,
+            option_name=option_name,
+            option_child=option_child
+        ))
+    return product_option
+
+def child_stock(child):
+    stock = child.get("stock") or {}
+    return stock.get("value", stock.get("stock", 0)) or 0
+
+def extract_variants(mini_variant):
     variants = []
-    mini_variant = find_component("mini_variant_options")
-    if mini_variant:
-        mini_variant = mini_variant[0] if mini_variant else {}
-        for option in mini_variant.get('variants', []):
-            option_id = int(option.get('productVariantID', 0) or 0)
-            option_name = option.get('name', '')
-            option_child = [x.get('value', '') for x in option.get('option', [])]
-            product_option.append(ProductOption(
-                option_id=option_id,
-                option_name=option_name,
-                option_child=option_child
-            ))
-
-        for child in mini_variant.get("children", []):
-            variants.append(
-                ProductVariant(
-                    option_ids=child.get("optionID", []),
-                    option_name=child.get('productName', ""),
-                    option_url=child.get('productURL', ""),
-                    price=child.get("price", 0),
-                    price_string=child.get("priceFmt", ""),
-                    discount=child.get('discPercentage', ""),
-                    image_url=child.get("picture", {}).get("url", ""),
-                    stock=child.get("stock", {}).get('value', 0),
-                )
+    for child in mini_variant.get("children") or []:
+        variants.append(
+            ProductVariant(
+                option_ids=child.get("optionID", []),
+                option_name=child.get('productName', ""),
+                option_url=child.get('productURL', ""),
+                price=child.get("price", 0),
+                price_string=child.get("priceFmt", ""),
+                discount=child.get('discPercentage', ""),
+                image_url=(child.get("picture") or {}).get("url", ""),
+                # the PDP query selects stock { stock }; 'value' is kept for
+                # payloads captured with older queries
+                stock=child_stock(child),
             )
+        )
+    return variants
 
-    return ProductData(
+def extract_scalars(basic_info, product_content):
+    # fields a trimmed query profile did not select come back missing or null
+    price = product_content.get("price") or {}
+    stats = basic_info.get("stats") or {}
+    menu = basic_info.get("menu") or {}
+    category = basic_info.get("category") or {}
+    return dict(
         product_id=basic_info.get('productID'),
         product_name=product_content.get("name", ""),
         url=basic_info.get("url", ""),
         product_status=basic_info.get("status", ""),
-        product_price=product_content.get("price", {}).get("value", 0),
-        product_price_text=product_content.get("price", {}).get("priceFmt", ""),
-        product_price_original=product_content.get("price", {}).get("slashPriceFmt", ""),
-        product_discount_percentage=product_content.get("price", {}).get("discPercentage", ""),
+        product_price=price.get("value", 0),
+        product_price_text=price.get("priceFmt", ""),
+        product_price_original=price.get("slashPriceFmt", ""),
+        product_discount_percentage=price.get("discPercentage", ""),
         weight=int(basic_info.get("weight", 0) or 0),
         weight_unit=basic_info.get("weightUnit", ""),
-        product_media=product_media,
-        sold_count=int(basic_info.get("txStats", {}).get("countSold", 0) or 0),
-        rating=float(basic_info.get("stats", {}).get("rating", 0) or 0),
-        review_count=int(basic_info.get("stats", {}).get("countReview", 0) or 0),
-        discussion_count=int(basic_info.get("stats", {}).get("countTalk", 0) or 0),
-        total_stock=int(basic_info.get("totalStockFmt", "0").replace(".", "") or 0),
-        etalase=basic_info.get("menu", {}).get("name", ""),
-        etalase_url=basic_info.get("menu", {}).get("url", ""),
-        category=basic_info.get("category", {}).get("name", ""),
-        sub_category=[d.get("name", "") for d in basic_info.get("category", {}).get("detail", [])],
-        product_option=product_option,
-        variants=variants,
+        sold_count=int((basic_info.get("txStats") or {}).get("countSold", 0) or 0),
+        rating=float(stats.get("rating", 0) or 0),
+        review_count=int(stats.get("countReview", 0) or 0),
+        discussion_count=int(stats.get("countTalk", 0) or 0),
+        total_stock=int((basic_info.get("totalStockFmt") or "0").replace(".", "") or 0),
+        etalase=menu.get("name", ""),
+        etalase_url=menu.get("url", ""),
+        category=category.get("name", ""),
+        sub_category=[d.get("name", "") for d in category.get("detail") or []],
         shop_id=int(basic_info.get("shopID", 0) or 0),
         shop_name=basic_info.get("shopName", ""),
-        shop_location=basic_info.get('shopMultilocation', {}).get('cityName', "")
+        shop_location=(basic_info.get('shopMultilocation') or {}).get('cityName', "")
     )
 
+class LazyProductData(ProductData):
+    # ProductData view over a parsed PDP payload. Scalar fields are extracted
+    # up front; product_media, product_option and variants are only built
+    # from the raw components the first time they are read, then cached.
+    # It takes ProductData's constructor arguments, so dataclasses.replace()
+    # works, and compares equal to the eager ProductData of the same product.
+    __slots__ = ('_media_raw', '_mini_variant', '_product_media', '_product_option', '_variants')
+
+    def __init__(self, *args, **kwargs):
+        self._media_raw = []
+        self._mini_variant = {}
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def from_components(cls, scalars, media_raw, mini_variant):
+        self = cls.__new__(cls)
+        for name, value in scalars.items():
+            setattr(self, name, value)
+        self._media_raw = media_raw
+        self._mini_variant = mini_variant
+        self._product_media = None
+        self._product_option = None
+        self._variants = None
+        return self
+
+    def __eq__(self, other):
+        if not isinstance(other, ProductData):
+            return NotImplemented
+        return all(getattr(self, f.name) == getattr(other, f.name) for f in fields(ProductData))
+
+    @property
+    def product_media(self):
+        if self._product_media is None:
+            self._product_media = extract_media(self._media_raw)
+        return self._product_media
+
+    @product_media.setter
+    def product_media(self, value):
+        self._product_media = value
+
+    @property
+    def product_option(self):
+        if self._product_option is None:
+            self._product_option = extract_options(self._mini_variant)
+        return self._product_option
+
+    @product_option.setter
+    def product_option(self, value):
+        self._product_option = value
+
+    @property
+    def variants(self):
+        if self._variants is None:
+            self._variants = extract_variants(self._mini_variant)
+        return self._variants
+
+    @variants.setter
+    def variants(self, value):
+        self._variants = value
+
+# Layout components the extractor reads
+PDP_COMPONENTS = frozenset(("product_content", "product_media", "mini_variant_options"))
+
+def index_components(components, names=PDP_COMPONENTS):
+    # One pass over the layout collecting name -> data for the wanted
+    # components (first occurrence wins), stopping once all are found
+    index = {}
+    remaining = len(names)
+    for c in components:
+        name = c.get("name")
+        if name in names and name not in index:
+            index[name] = c.get("data", [])
+            remaining -= 1
+            if not remaining:
+                break
+    return index
+
+class ProductExtractor:
+    # Reusable PDP extractor. The layout component list is indexed once per
+    # payload instead of being scanned for every component we need, which is
+    # the hot path when re-extracting archived responses in bulk.
+    def __init__(self, lazy=False):
+        self.lazy = lazy
+
+    def __call__(self, json_data):
+        pdp = (json_data.get("data") or {}).get("pdpGetLayout") or {}
+        components = index_components(pdp.get("components") or [])
+
+        product_content = components.get("product_content")
+        product_content = product_content[0] if product_content else {}
+        product_media_raw = components.get("product_media")
+        product_media_raw = product_media_raw[0].get("media", []) if product_media_raw else []
+        mini_variant = components.get("mini_variant_options")
+        mini_variant = mini_variant[0] if mini_variant else {}
+
+        scalars = extract_scalars(pdp.get("basicInfo") or {}, product_content)
+        if self.lazy:
+            return LazyProductData.from_components(scalars, product_media_raw, mini_variant)
+
+        return ProductData(
+            **scalars,
+            product_media=extract_media(product_media_raw),
+            product_option=extract_options(mini_variant),
+            variants=extract_variants(mini_variant),
+        )
+
+    def extract_many(self, payloads):
+        # payloads may be parsed dicts or raw response bodies (bytes/str)
+        for payload in payloads:
+            if isinstance(payload, (bytes, bytearray, str)):
+                payload = loads(payload)
+            yield self(payload)
+
+_extractors = {False: ProductExtractor(), True: ProductExtractor(lazy=True)}
+
+def product_details_extractor(json_data, lazy=False):
+    return _extractors[bool(lazy)](json_data)
+
 def parse_tokped_url(url):
     temp = url.split('?')[0]
-    temp = url.split('tokopedia.com/')[1].split('/')
+    temp = temp.split('tokopedia.com/')[1].split('/')
     shop_id = temp[0] if len(temp) > 0 else ""
     product_key = temp[1] if len(temp) > 1 else ""
     return shop_id, product_key
 
-def get_product(product_id=None, url=None, debug=False):
-    # check http on url
-    assert url or product_id
-    if url:
-        shop_id, product_key = parse_tokped_url(url)
-    if product_id:
-        product_id = str(product_id)
+PDP_PATH = '/graphql/ProductDetails/getPDPLayout'
 
-    headers = {
+PDP_QUERY = 'query PDP_getPDPLayout($productId: String, $shopDomain: String, $productKey: String, $apiVersion: Float, $whID: String, $layoutID: String, $userLocation: pdpUserLocation, $extParam: String, $tokonow: pdpTokoNow) {\npdpGetLayout(productID: $productId, shopDomain: $shopDomain, productKey: $productKey, apiVersion: $apiVersion, whID: $whID, layoutID: $layoutID, userLocation: $userLocation, extParam: $extParam, tokonow: $tokonow) {\nrequestID\nname\npdpSession\nbasicInfo {\nproductID\ninitialVariantOptionID\ncategory {\nid\nname\ntitle\nbreadcrumbURL\nisAdult\nisKyc\ndetail {\nid\nname\nbreadcrumbURL\n}\nttsID\nttsDetail {\nid\nname\nbreadcrumbURL\n}\n}\nmenu {\nid\nname\nurl\n}\nshopID\nshopName\nalias\nminOrder\nmaxOrder\nurl\ncatalogID\nneedPrescription\nweight\nweightUnit\nstatus\ntxStats {\ntransactionReject\ntransactionSuccess\ncountSold\nitemSoldFmt\n}\nstats {\nrating\ncountTalk\ncountView\ncountReview\n}\ndefaultOngkirEstimation\nisTokoNow\ntotalStockFmt\nisGiftable\ndefaultMediaURL\nshopMultilocation {\ncityName\n}\nisBlacklisted\nblacklistMessage {\ntitle\ndescription\nbutton\n}\nweightWording\nttsPID\nttsSKUID\nttsShopID\n}\nadditionalData {\nfomoSocialProofs {\nname\ntext\nicons\ntypeIcon\nbackgroundColor\nposition\n}\n}\ncomponents {\nname\ntype\nkind\ndata {\n... on pdpDataComponentSocialProofV2 {\nsocialProofContent {\nsocialProofType\nsocialProofID\ntitle\nsubtitle\nicon\napplink {\nappLink\n}\nbgColor\nchevronColor\nshowChevron\nhasSeparator\n}\n}\n... on pdpDataProductMedia {\nmedia {\ntype\nURLOriginal\nURLThumbnail\ndescription\nvideoURLIOS\nisAutoplay\nindex\nvariantOptionID\nURLMaxRes\n}\nrecommendation{\nlightIcon\ndarkIcon\niconText\nbottomsheetTitle\nrecommendation\n}\nvideos {\nsource\nurl\n}\ncontainerType\nliveIndicator {\nisLive\nchannelID\nmediaURL\napplink\n}\nshowJumpToVideo\n}\n... on pdpDataProductContent {\nname\nprice {\nvalue\ncurrency\nlastUpdateUnix\npriceFmt\nslashPriceFmt\ndiscPercentage\ncurrencyFmt\nvalueFmt\n}\ncampaign {\ncampaignID\ncampaignType\ncampaignTypeName\npercentageAmount\noriginalPrice\ndiscountedPrice\noriginalStock\nstock\nstockSoldPercentage\nendDateUnix\nisActive\nhideGimmick\nisUsingOvo\ncampaignIdentifier\nbackground\npaymentInfoWording\nproductID\ncampaignLogo\nshowStockBar\n}\nthematicCampaign {\nproductID\ncampaignName\nbackground\nicon\ncampaignLogo\nsuperGraphicURL\n}\nstock {\nuseStock\nvalue\nstockWording\n}\nvariant {\nisVariant\n}\nwholesale {\nminQty\nprice {\nvalue\ncurrency\nlastUpdateUnix\n}\n}\nisFreeOngkir {\nisActive\nimageURL\n}\npreorder {\nduration\ntimeUnit\nisActive\npreorderInDays\n}\nisCashback {\npercentage\n}\nisTradeIn\nisOS\nisPowerMerchant\nisWishlist\nisCOD\nparentName\nisShowPrice\nlabelIcons {\niconURL\nlabel\n}\n}\n... on pdpDataProductInfo {\nrow\ncontent {\ntitle\nsubtitle\napplink\n}\n}\n... on pdpDataInfo {\ntitle\napplink\nisApplink\nicon\nlightIcon\ndarkIcon\ncontent {\nicon\ntext\n}\nseparator\n}\n... on pdpDataProductVariant {\nparentID\ndefaultChild\nsizeChart\nmaxFinalPrice\ncomponentType\nlandingSubText\nsocialProof {\nbgColor\ncontents {\nname\ncontent\niconURL\n}\n}\nvariants {\nproductVariantID\nvariantID\nname\nidentifier\noption {\nproductVariantOptionID\nvariantUnitValueID\nvalue\nhex\npicture {\nurl\nurl100\n}\n}\n}\nchildren {\nproductID\nprice\npriceFmt\nslashPriceFmt\ndiscPercentage\nsku\noptionID\nproductName\nproductURL\npicture {\nurl\nurl100\n}\nstock {\nstock\nisBuyable\nstockWording\nstockWordingHTML\nminimumOrder\nmaximumOrder\nstockFmt\nstockCopy\n}\nisCOD\nisWishlist\ncampaignInfo {\ncampaignID\ncampaignType\ncampaignTypeName\ndiscountPercentage\noriginalPrice\ndiscountPrice\nstock\nstockSoldPercentage\nendDateUnix\nappLinks\nisActive\nhideGimmick\nisUsingOvo\nminOrder\ncampaignIdentifier\nbackground\npaymentInfoWording\ncampaignLogo\nshowStockBar\n}\nthematicCampaign {\ncampaignName\nicon\nbackground\nproductID\ncampaignLogo\nsuperGraphicURL\n}\nsubText\npromo {\nvalue\niconURL\nproductID\npromoPriceFmt\nsubtitle\napplink\ncolor\nbackground\npromoType\nsuperGraphicURL\npriceAdditionalFmt\nseparatorColor\nbottomsheetParam\npromoCodes {\npromoID\npromoCode\npromoCodeType\n}\n}\ncurrencyFmt\nvaluePriceFmt\ncomponentPriceType\nisTopSold\nlabelIcons {\niconURL\nlabel\n}\nttsPID\nttsSKUID\n}\n}\n... on pdpDataCustomInfo {\nicon\ntitle\nisApplink\napplink\nseparator\ndescription\nlabel {\nvalue\ncolor\n}\nlightIcon\ndarkIcon\n}\n... on pdpDataComponentReviewV2 {\nmostHelpfulReviewParam {\nlimit\n}\n}\n... on pdpDataProductDetail {\ntitle\ncontent {\ntype\nkey\nextParam\naction\ntitle\nsubtitle\napplink\nshowAtFront\nshowAtBottomsheet\ninfoLink\nicon\n}\ncatalogBottomsheet {\nactionTitle\nbottomSheetTitle\nparam\n}\nbottomsheet {\nactionTitle\nbottomSheetTitle\nparam\n}\n}\n... on pdpDataOneLiner {\nproductID\noneLinerContent\nlinkText\napplink\nseparator\nisVisible\ncolor\nicon\neduLink {\nappLink\n}\n}\n... on pdpDataCategoryCarousel {\nlinkText\ntitleCarousel\napplink\nlist {\ncategoryID\nicon\ntitle\nisApplink\napplink\n}\n}\n... on pdpDataBundleComponentInfo {\ntitle\nwidgetType\nproductID\nwhID\n}\n... on pdpDataDynamicOneLiner {\nname\napplink\nseparator\nicon\nstatus\nchevronPos\ntext\nbgColor\nchevronColor\npadding {\nt\nb\n}\nimageSize {\nw\nh\n}\n}\n... on pdpDataComponentDynamicOneLinerVariant {\nname\napplink\nseparator\nicon\nstatus\nchevronPos\ntext\nbgColor\nchevronColor\npadding {\nt\nb\n}\nimageSize {\nw\nh\n}\n}\n... on pdpDataCustomInfoTitle {\ntitle\nstatus\ncomponentName\n}\n... on pdpDataProductDetailMediaComponent {\ntitle\ndescription\ncontentMedia {\nurl\nratio\ntype\n}\nshow\nctaText\n}\n... on pdpDataOnGoingCampaign {\ncampaign {\ncampaignID\ncampaignType\ncampaignTypeName\npercentageAmount\noriginalPrice\ndiscountedPrice\noriginalStock\nstock\nstockSoldPercentage\nendDateUnix\nisActive\nhideGimmick\nisUsingOvo\ncampaignIdentifier\nbackground\npaymentInfoWording\nproductID\ncampaignLogo\nshowStockBar\n}\nthematicCampaign {\nproductID\ncampaignName\nbackground\nicon\ncampaignLogo\nsuperGraphicURL\n}\n}\n... on pdpDataProductListComponent {\nthematicID\nqueryParam\n}\n... on pdpDataComponentPromoPrice {\nprice {\nvalue\ncurrency\nlastUpdateUnix\npriceFmt\nslashPriceFmt\ndiscPercentage\ncurrencyFmt\nvalueFmt\n}\npromo {\nvalue\niconURL\nproductID\npromoPriceFmt\nsubtitle\napplink\ncolor\nbackground\npromoType\nsuperGraphicURL\npriceAdditionalFmt\nseparatorColor\nbottomsheetParam\npromoCodes {\npromoID\npromoCode\npromoCodeType\n}\n}\ncomponentPriceType\n}\n... on pdpDataComponentSDUIDivKit {\ntemplate\n}\n... on pdpDataComponentShipmentV4 {\ndata {\nproductID\nwarehouse_info {\nwarehouse_id\nis_fulfillment\ndistrict_id\npostal_code\ngeolocation\ncity_name\nttsWarehouseID\n}\nuseBOVoucher\nisCOD\nmetadata\n}\n}\n... on pdpDataComponentShipmentV5 {\ndata {\nproductID\nwarehouse_info {\nwarehouse_id\nis_fulfillment\ndistrict_id\npostal_code\ngeolocation\ncity_name\nttsWarehouseID\n}\nuseBOVoucher\nisCOD\nmetadata\n}\n}\n...on pdpDataAffordabilityGroupLabel {\naffordabilityData{\nproductID\nproductVouchers {\nidentifier\ntype\ntext\nbackgroundColor\n}\nshowChevron\nchevronColor\nappliedVoucherTypeIDs\n}\n}\n}\n}\n}\n}'
+
+def product_headers():
+    return {
         'Host': 'gql.tokopedia.com',
-        'Fingerprint-Data': randomize_fp(),
-        'X-Tkpd-Path': '/graphql/ProductDetails/getPDPLayout',
+        'X-Tkpd-Path': PDP_PATH,
         'X-Method': 'POST',
         'Request-Method': 'POST',
         'X-Tkpd-Akamai': 'pdpGetLayout',
@@ -123,7 +238,15 @@ def get_product(product_id=None, url=None, debug=False):
         'X-Price-Center': 'true',
     }
 
-    json_data = {
+def product_payload(product_id=None, url=None, profile='full'):
+    # check http on url
+    assert url or product_id
+    if url:
+        shop_id, product_key = parse_tokped_url(url)
+    if product_id:
+        product_id = str(product_id)
+
+    return {
         'variables': {
             'apiVersion': 1,
             'userLocation': {
@@ -148,21 +271,170 @@ def get_product(product_id=None, url=None, debug=False):
             'whID': '',
             'layoutID': '',
         },
-        'query': 'query PDP_getPDPLayout($productId: String, $shopDomain: String, $productKey: String, $apiVersion: Float, $whID: String, $layoutID: String, $userLocation: pdpUserLocation, $extParam: String, $tokonow: pdpTokoNow) {\npdpGetLayout(productID: $productId, shopDomain: $shopDomain, productKey: $productKey, apiVersion: $apiVersion, whID: $whID, layoutID: $layoutID, userLocation: $userLocation, extParam: $extParam, tokonow: $tokonow) {\nrequestID\nname\npdpSession\nbasicInfo {\nproductID\ninitialVariantOptionID\ncategory {\nid\nname\ntitle\nbreadcrumbURL\nisAdult\nisKyc\ndetail {\nid\nname\nbreadcrumbURL\n}\nttsID\nttsDetail {\nid\nname\nbreadcrumbURL\n}\n}\nmenu {\nid\nname\nurl\n}\nshopID\nshopName\nalias\nminOrder\nmaxOrder\nurl\ncatalogID\nneedPrescription\nweight\nweightUnit\nstatus\ntxStats {\ntransactionReject\ntransactionSuccess\ncountSold\nitemSoldFmt\n}\nstats {\nrating\ncountTalk\ncountView\ncountReview\n}\ndefaultOngkirEstimation\nisTokoNow\ntotalStockFmt\nisGiftable\ndefaultMediaURL\nshopMultilocation {\ncityName\n}\nisBlacklisted\nblacklistMessage {\ntitle\ndescription\nbutton\n}\nweightWording\nttsPID\nttsSKUID\nttsShopID\n}\nadditionalData {\nfomoSocialProofs {\nname\ntext\nicons\ntypeIcon\nbackgroundColor\nposition\n}\n}\ncomponents {\nname\ntype\nkind\ndata {\n... on pdpDataComponentSocialProofV2 {\nsocialProofContent {\nsocialProofType\nsocialProofID\ntitle\nsubtitle\nicon\napplink {\nappLink\n}\nbgColor\nchevronColor\nshowChevron\nhasSeparator\n}\n}\n... on pdpDataProductMedia {\nmedia {\ntype\nURLOriginal\nURLThumbnail\ndescription\nvideoURLIOS\nisAutoplay\nindex\nvariantOptionID\nURLMaxRes\n}\nrecommendation{\nlightIcon\ndarkIcon\niconText\nbottomsheetTitle\nrecommendation\n}\nvideos {\nsource\nurl\n}\ncontainerType\nliveIndicator {\nisLive\nchannelID\nmediaURL\napplink\n}\nshowJumpToVideo\n}\n... on pdpDataProductContent {\nname\nprice {\nvalue\ncurrency\nlastUpdateUnix\npriceFmt\nslashPriceFmt\ndiscPercentage\ncurrencyFmt\nvalueFmt\n}\ncampaign {\ncampaignID\ncampaignType\ncampaignTypeName\npercentageAmount\noriginalPrice\ndiscountedPrice\noriginalStock\nstock\nstockSoldPercentage\nendDateUnix\nisActive\nhideGimmick\nisUsingOvo\ncampaignIdentifier\nbackground\npaymentInfoWording\nproductID\ncampaignLogo\nshowStockBar\n}\nthematicCampaign {\nproductID\ncampaignName\nbackground\nicon\ncampaignLogo\nsuperGraphicURL\n}\nstock {\nuseStock\nvalue\nstockWording\n}\nvariant {\nisVariant\n}\nwholesale {\nminQty\nprice {\nvalue\ncurrency\nlastUpdateUnix\n}\n}\nisFreeOngkir {\nisActive\nimageURL\n}\npreorder {\nduration\ntimeUnit\nisActive\npreorderInDays\n}\nisCashback {\npercentage\n}\nisTradeIn\nisOS\nisPowerMerchant\nisWishlist\nisCOD\nparentName\nisShowPrice\nlabelIcons {\niconURL\nlabel\n}\n}\n... on pdpDataProductInfo {\nrow\ncontent {\ntitle\nsubtitle\napplink\n}\n}\n... on pdpDataInfo {\ntitle\napplink\nisApplink\nicon\nlightIcon\ndarkIcon\ncontent {\nicon\ntext\n}\nseparator\n}\n... on pdpDataProductVariant {\nparentID\ndefaultChild\nsizeChart\nmaxFinalPrice\ncomponentType\nlandingSubText\nsocialProof {\nbgColor\ncontents {\nname\ncontent\niconURL\n}\n}\nvariants {\nproductVariantID\nvariantID\nname\nidentifier\noption {\nproductVariantOptionID\nvariantUnitValueID\nvalue\nhex\npicture {\nurl\nurl100\n}\n}\n}\nchildren {\nproductID\nprice\npriceFmt\nslashPriceFmt\ndiscPercentage\nsku\noptionID\nproductName\nproductURL\npicture {\nurl\nurl100\n}\nstock {\nstock\nisBuyable\nstockWording\nstockWordingHTML\nminimumOrder\nmaximumOrder\nstockFmt\nstockCopy\n}\nisCOD\nisWishlist\ncampaignInfo {\ncampaignID\ncampaignType\ncampaignTypeName\ndiscountPercentage\noriginalPrice\ndiscountPrice\nstock\nstockSoldPercentage\nendDateUnix\nappLinks\nisActive\nhideGimmick\nisUsingOvo\nminOrder\ncampaignIdentifier\nbackground\npaymentInfoWording\ncampaignLogo\nshowStockBar\n}\nthematicCampaign {\ncampaignName\nicon\nbackground\nproductID\ncampaignLogo\nsuperGraphicURL\n}\nsubText\npromo {\nvalue\niconURL\nproductID\npromoPriceFmt\nsubtitle\napplink\ncolor\nbackground\npromoType\nsuperGraphicURL\npriceAdditionalFmt\nseparatorColor\nbottomsheetParam\npromoCodes {\npromoID\npromoCode\npromoCodeType\n}\n}\ncurrencyFmt\nvaluePriceFmt\ncomponentPriceType\nisTopSold\nlabelIcons {\niconURL\nlabel\n}\nttsPID\nttsSKUID\n}\n}\n... on pdpDataCustomInfo {\nicon\ntitle\nisApplink\napplink\nseparator\ndescription\nlabel {\nvalue\ncolor\n}\nlightIcon\ndarkIcon\n}\n... on pdpDataComponentReviewV2 {\nmostHelpfulReviewParam {\nlimit\n}\n}\n... on pdpDataProductDetail {\ntitle\ncontent {\ntype\nkey\nextParam\naction\ntitle\nsubtitle\napplink\nshowAtFront\nshowAtBottomsheet\ninfoLink\nicon\n}\ncatalogBottomsheet {\nactionTitle\nbottomSheetTitle\nparam\n}\nbottomsheet {\nactionTitle\nbottomSheetTitle\nparam\n}\n}\n... on pdpDataOneLiner {\nproductID\noneLinerContent\nlinkText\napplink\nseparator\nisVisible\ncolor\nicon\neduLink {\nappLink\n}\n}\n... on pdpDataCategoryCarousel {\nlinkText\ntitleCarousel\napplink\nlist {\ncategoryID\nicon\ntitle\nisApplink\napplink\n}\n}\n... on pdpDataBundleComponentInfo {\ntitle\nwidgetType\nproductID\nwhID\n}\n... on pdpDataDynamicOneLiner {\nname\napplink\nseparator\nicon\nstatus\nchevronPos\ntext\nbgColor\nchevronColor\npadding {\nt\nb\n}\nimageSize {\nw\nh\n}\n}\n... on pdpDataComponentDynamicOneLinerVariant {\nname\napplink\nseparator\nicon\nstatus\nchevronPos\ntext\nbgColor\nchevronColor\npadding {\nt\nb\n}\nimageSize {\nw\nh\n}\n}\n... on pdpDataCustomInfoTitle {\ntitle\nstatus\ncomponentName\n}\n... on pdpDataProductDetailMediaComponent {\ntitle\ndescription\ncontentMedia {\nurl\nratio\ntype\n}\nshow\nctaText\n}\n... on pdpDataOnGoingCampaign {\ncampaign {\ncampaignID\ncampaignType\ncampaignTypeName\npercentageAmount\noriginalPrice\ndiscountedPrice\noriginalStock\nstock\nstockSoldPercentage\nendDateUnix\nisActive\nhideGimmick\nisUsingOvo\ncampaignIdentifier\nbackground\npaymentInfoWording\nproductID\ncampaignLogo\nshowStockBar\n}\nthematicCampaign {\nproductID\ncampaignName\nbackground\nicon\ncampaignLogo\nsuperGraphicURL\n}\n}\n... on pdpDataProductListComponent {\nthematicID\nqueryParam\n}\n... on pdpDataComponentPromoPrice {\nprice {\nvalue\ncurrency\nlastUpdateUnix\npriceFmt\nslashPriceFmt\ndiscPercentage\ncurrencyFmt\nvalueFmt\n}\npromo {\nvalue\niconURL\nproductID\npromoPriceFmt\nsubtitle\napplink\ncolor\nbackground\npromoType\nsuperGraphicURL\npriceAdditionalFmt\nseparatorColor\nbottomsheetParam\npromoCodes {\npromoID\npromoCode\npromoCodeType\n}\n}\ncomponentPriceType\n}\n... on pdpDataComponentSDUIDivKit {\ntemplate\n}\n... on pdpDataComponentShipmentV4 {\ndata {\nproductID\nwarehouse_info {\nwarehouse_id\nis_fulfillment\ndistrict_id\npostal_code\ngeolocation\ncity_name\nttsWarehouseID\n}\nuseBOVoucher\nisCOD\nmetadata\n}\n}\n... on pdpDataComponentShipmentV5 {\ndata {\nproductID\nwarehouse_info {\nwarehouse_id\nis_fulfillment\ndistrict_id\npostal_code\ngeolocation\ncity_name\nttsWarehouseID\n}\nuseBOVoucher\nisCOD\nmetadata\n}\n}\n...on pdpDataAffordabilityGroupLabel {\naffordabilityData{\nproductID\nproductVouchers {\nidentifier\ntype\ntext\nbackgroundColor\n}\nshowChevron\nchevronColor\nappliedVoucherTypeIDs\n}\n}\n}\n}\n}\n}',
+        'query': product_query(profile)
     }
 
+def get_product(product_id=None, url=None, debug=False, client=None, lazy=False, profile='full'):
+    client = client or get_default_client()
+    json_data = product_payload(product_id=product_id, url=url, profile=profile)
+
     try:
-        response = requests.post(
-            'https://gql.tokopedia.com/graphql/ProductDetails/getPDPLayout',
-            headers=headers,
-            json=json_data,
-            verify=False,
+        response = client.post(
+            PDP_PATH,
+            endpoint='product',
+            headers=product_headers(),
+            json_data=json_data,
         )
-        result_json = response.json()
-        product_data = product_details_extractor(result_json)
+        result_json = timed_decode(client, 'product', response)
+        product_data = timed_extract(client, 'product', product_details_extractor, result_json, lazy=lazy)
         if debug:
             logger.detail(f"{product_data.product_id} - {product_data.product_name[0:40]}...")
         return product_data
     except Exception as e:
         print(traceback.format_exc())
-        exit()
\ No newline at end of file
+        return None
+
+def product_ref(id_or_url):
+    id_or_url = str(id_or_url)
+    if 'tokopedia.com/' in id_or_url:
+        return {'url': id_or_url}
+    return {'product_id': id_or_url}
+
+def get_products(ids_or_urls, batch_size=10, debug=False, client=None, lazy=False, profile='full'):
+    # Packs up to batch_size PDP_getPDPLayout operations into one POST as a
+    # GraphQL batch array. Returns one ProductData per input, in input order,
+    # with None where the product could not be fetched or parsed.
+    client = client or get_default_client()
+    ids_or_urls = list(ids_or_urls)
+    products = []
+
+    for start in range(0, len(ids_or_urls), batch_size):
+        batch = ids_or_urls[start:start + batch_size]
+        json_data = [product_payload(**product_ref(x), profile=profile) for x in batch]
+        batch_products = [None] * len(batch)
+
+        try:
+            response = client.post(
+                PDP_PATH,
+                endpoint='product',
+                headers=product_headers(),
+                json_data=json_data,
+            )
+            result_json = timed_decode(client, 'product', response)
+            if isinstance(result_json, dict):
+                result_json = [result_json]
+
+            for index, item in enumerate(result_json[:len(batch)]):
+                if not (item.get('data') or {}).get('pdpGetLayout'):
+                    continue
+                product_data = timed_extract(client, 'product', product_details_extractor, item, lazy=lazy)
+                if debug:
+                    logger.detail(f"{product_data.product_id} - {product_data.product_name[0:40]}...")
+                batch_products[index] = product_data
+        except:
+            print(traceback.format_exc())
+
+        products.extend(batch_products)
+    return products
+
+# Outcome statuses for get_product_batch. throttled (HTTP 429), server_error
+# (5xx) and error (transport failure) are retried after the main pass; the
+# others are final.
+OK = 'ok'
+NOT_FOUND = 'not_found'
+THROTTLED = 'throttled'
+SERVER_ERROR = 'server_error'
+PARSE_ERROR = 'parse_error'
+ERROR = 'error'
+RETRYABLE = (THROTTLED, SERVER_ERROR, ERROR)
+
+def fetch_product_outcome(id_or_url, debug=False, client=None, lazy=False, profile='full'):
+    client = client or get_default_client()
+    ref = str(id_or_url)
+    try:
+        response = client.post(
+            PDP_PATH,
+            endpoint='product',
+            headers=product_headers(),
+            json_data=product_payload(**product_ref(id_or_url), profile=profile),
+        )
+    except Exception as e:
+        return ProductOutcome(ref, ERROR, error=repr(e))
+
+    if response.status_code == 429:
+        return ProductOutcome(ref, THROTTLED, error=f"HTTP {response.status_code}")
+    if response.status_code >= 500:
+        return ProductOutcome(ref, SERVER_ERROR, error=f"HTTP {response.status_code}")
+
+    try:
+        result_json = timed_decode(client, 'product', response)
+    except Exception as e:
+        return ProductOutcome(ref, PARSE_ERROR, error=repr(e))
+
+    if not (result_json.get('data') or {}).get('pdpGetLayout'):
+        return ProductOutcome(ref, NOT_FOUND, error=str(result_json.get('errors', '')) or None)
+
+    try:
+        product_data = timed_extract(client, 'product', product_details_extractor, result_json, lazy=lazy)
+    except Exception as e:
+        return ProductOutcome(ref, PARSE_ERROR, error=repr(e))
+
+    if debug:
+        logger.detail(f"{product_data.product_id} - {product_data.product_name[0:40]}...")
+    return ProductOutcome(ref, OK, product=product_data)
+
+def get_product_batch(ids_or_urls, workers=8, retry_rounds=2, retry_delay=1.0, debug=False, client=None, on_outcome=None, lazy=False, profile='full'):
+    # Fetches every product and never raises for a single bad item. Returns one
+    # ProductOutcome per input, in input order. Throttled, server and transport
+    # failures go to a retry queue that is drained after the main pass, so
+    # they don't hold up the rest of the batch. on_outcome(outcome) fires as
+    # each item settles.
+    client = client or get_default_client()
+    ids_or_urls = list(ids_or_urls)
+    outcomes = [None] * len(ids_or_urls)
+    pending = list(range(len(ids_or_urls)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for round_number in range(retry_rounds + 1):
+            if not pending:
+                break
+            if round_number:
+                time.sleep(retry_delay)
+
+            retry_queue = []
+            futures = {
+                submit(executor, fetch_product_outcome, ids_or_urls[index], debug, client, lazy, profile): index
+                for index in pending
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                outcome = future.result()
+                outcome.attempts = round_number + 1
+                outcomes[index] = outcome
+                if outcome.status in RETRYABLE and round_number < retry_rounds:
+                    retry_queue.append(index)
+                elif on_outcome:
+                    on_outcome(outcome)
+            pending = retry_queue
+
+    return outcomes
+
+async def async_get_product(product_id=None, url=None, debug=False, client=None, lazy=False, profile='full'):
+    client = client or get_default_async_client()
+    json_data = product_payload(product_id=product_id, url=url, profile=profile)
+
+    try:
+        response = await client.post(
+            PDP_PATH,
+            endpoint='product',
+            headers=product_headers(),
+            json_data=json_data,
+        )
+        result_json = timed_decode(client, 'product', response)
+        product_data = timed_extract(client, 'product', product_details_extractor, result_json, lazy=lazy)
+        if debug:
+            logger.detail(f"{product_data.product_id} - {product_data.product_name[0:40]}...")
+        return product_data
+    except:
+        print(traceback.format_exc())
+        return None
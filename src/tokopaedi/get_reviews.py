@@ -1,34 +1,39 @@
-from curl_cffi import requests
+import asyncio
 import logging
+import math
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from .tokopaedi_types import ProductReview
 from .custom_logging import setup_custom_logging
-from .get_fingerprint import randomize_fp
+from .client import get_default_client, get_default_async_client
+from .metrics import timed_decode, timed_extract
+from .tracing import submit
+from .query_profiles import reviews_query
 
 logger = setup_custom_logging()
 
 def extract_reviews(json_data):
     reviews = []
     
-    data = json_data.get("data", {})
-    productrev_list = data.get("productrevGetProductReviewList", {})
-    items = productrev_list.get("list", [])
+    data = json_data.get("data") or {}
+    productrev_list = data.get("productrevGetProductReviewList") or {}
+    items = productrev_list.get("list") or []
     
     if not items:
         return reviews
 
     for item in items:
-        images = item.get("imageAttachments", [])
-        videos = item.get("videoAttachments", [])
-        like_dislike = item.get("likeDislike", {})
-        user = item.get("user", {})
-        review_response = item.get("reviewResponse", {})
+        images = item.get("imageAttachments") or []
+        videos = item.get("videoAttachments") or []
+        like_dislike = item.get("likeDislike") or {}
+        user = item.get("user") or {}
+        review_response = item.get("reviewResponse") or {}
 
         review = ProductReview(
-            feedback_id=int(item.get("feedbackID", 0)),
+            feedback_id=int(item.get("feedbackID", 0) or 0),
             variant_name=item.get("variantName", ""),
             message=item.get("message", ""),
-            rating=float(item.get("productRating", 0)),
+            rating=float(item.get("productRating", 0) or 0),
             review_age=item.get("reviewCreateTimestamp", ""),
             user_full_name=user.get("fullName", ""),
             user_url=user.get("url", ""),
@@ -42,12 +47,17 @@ def extract_reviews(json_data):
 
     return reviews
 
-def get_reviews(product_id, max_result=10, page=1, result_count=0, debug=False):
-    product_id = str(product_id)
-    headers = {
+REVIEWS_PATH = '/graphql/ProductReview/getProductReviewReadingList'
+
+# Largest `limit` productrevGetProductReviewList accepts per page
+REVIEWS_MAX_PAGE_SIZE = 50
+
+REVIEWS_QUERY = 'query productrevGetProductReviewList($productID: String!, $page: Int!, $limit: Int!, $sortBy: String,\n$filterBy: String, $opt: String) {\nproductrevGetProductReviewList(productID: $productID, page: $page, limit: $limit, sortBy: $sortBy,\nfilterBy: $filterBy, opt: $opt) {\nlist {\nfeedbackID\nvariantName\nmessage\nproductRating\nreviewCreateTime\nreviewCreateTimestamp\nisAnonymous\nisReportable\nreviewResponse {\nmessage\ncreateTime\n}\nuser {\nuserID\nfullName\nimage\nurl\nlabel\n}\nimageAttachments {\nattachmentID\nimageThumbnailUrl\nimageUrl\n}\nvideoAttachments {\nattachmentID\nvideoUrl\n}\nlikeDislike {\ntotalLike\nlikeStatus\n}\nstats {\nkey\nformatted\ncount\n}\nbadRatingReasonFmt\n}\nshop {\nshopID\nname\nurl\nimage\n}\nvariantFilter {\nisUnavailable\nticker\n}\nhasNext\n}\n}'
+
+def reviews_headers():
+    return {
         'Host': 'gql.tokopedia.com',
-        'Fingerprint-Data': randomize_fp(),
-        'X-Tkpd-Path': '/graphql/ProductReview/getProductReviewReadingList',
+        'X-Tkpd-Path': REVIEWS_PATH,
         'X-Device': 'ios-2.318.0',
         'Request-Method': 'POST',
         'X-Method': 'POST',
@@ -61,47 +71,109 @@ def get_reviews(product_id, max_result=10, page=1, result_count=0, debug=False):
         'X-Price-Center': 'true',
     }
 
-    json_data = {
-        'query': 'query productrevGetProductReviewList($productID: String!, $page: Int!, $limit: Int!, $sortBy: String,\n$filterBy: String, $opt: String) {\nproductrevGetProductReviewList(productID: $productID, page: $page, limit: $limit, sortBy: $sortBy,\nfilterBy: $filterBy, opt: $opt) {\nlist {\nfeedbackID\nvariantName\nmessage\nproductRating\nreviewCreateTime\nreviewCreateTimestamp\nisAnonymous\nisReportable\nreviewResponse {\nmessage\ncreateTime\n}\nuser {\nuserID\nfullName\nimage\nurl\nlabel\n}\nimageAttachments {\nattachmentID\nimageThumbnailUrl\nimageUrl\n}\nvideoAttachments {\nattachmentID\nvideoUrl\n}\nlikeDislike {\ntotalLike\nlikeStatus\n}\nstats {\nkey\nformatted\ncount\n}\nbadRatingReasonFmt\n}\nshop {\nshopID\nname\nurl\nimage\n}\nvariantFilter {\nisUnavailable\nticker\n}\nhasNext\n}\n}',
+def reviews_payload(product_id, page=1, page_size=10, profile='full'):
+    return {
+        'query': reviews_query(profile),
         'variables': {
-            'productID': product_id,
+            'productID': str(product_id),
             'page': page,
             'filterBy': '',
             'opt': '',
-            'limit': 10,
+            'limit': page_size,
             'sortBy': 'informative_score desc',
         },
     }
 
+def parse_reviews_page(result_json, debug=False):
+    has_next = ((result_json.get('data') or {}).get('productrevGetProductReviewList') or {}).get('hasNext', False)
+    current_result = extract_reviews(result_json)
+    if debug:
+        for line in current_result:
+            review_message = line.message.replace('\n','')[0:40]
+            logger.reviews(f"{line.feedback_id} - {review_message}...")
+    return current_result, has_next
+
+def clamp_page_size(page_size):
+    return max(1, min(int(page_size), REVIEWS_MAX_PAGE_SIZE))
+
+def merge_review_pages(reviews, pages):
+    # Appends pages (in page order) to reviews, stopping at the first short
+    # or final page. Returns whether more pages may follow.
+    for current_result, has_next in pages:
+        reviews.extend(current_result)
+        if not current_result or not has_next:
+            return False
+    return True
+
+def next_window(next_page, fetched, wanted, page_size, workers):
+    # The next batch of pages to request: at most `workers` of them, and no
+    # more than needed to reach `wanted` reviews
+    count = min(workers, math.ceil((wanted - fetched) / page_size))
+    return range(next_page, next_page + count)
+
+def get_reviews(product_id, max_result=10, page=1, result_count=0, debug=False, client=None, page_size=10, workers=4, profile='full'):
+    product_id = str(product_id)
+    client = client or get_default_client()
+    page_size = clamp_page_size(page_size)
+    workers = max(1, workers)
+    wanted = max_result - result_count
+
+    def fetch_page(current_page):
+        response = client.post(
+            REVIEWS_PATH,
+            endpoint='reviews',
+            headers=reviews_headers(),
+            json_data=reviews_payload(product_id, current_page, page_size, profile),
+        )
+        return timed_extract(client, 'reviews', parse_reviews_page, timed_decode(client, 'reviews', response), debug)
+
     try:
-        response = requests.post(
-            'https://gql.tokopedia.com/graphql/ProductReview/getProductReviewReadingList',
-            headers=headers,
-            json=json_data,
-            verify=False,
+        # The first page tells us whether there is more. Further pages go out
+        # `workers` at a time and fetching stops at the first final page, so
+        # a product with few reviews costs few requests.
+        reviews = []
+        more = merge_review_pages(reviews, [fetch_page(page)])
+        next_page = page + 1
+        while more and len(reviews) < wanted:
+            window = next_window(next_page, len(reviews), wanted, page_size, workers)
+            next_page = window.stop
+            if len(window) == 1:
+                pages = [fetch_page(window.start)]
+            else:
+                with ThreadPoolExecutor(max_workers=len(window)) as executor:
+                    futures = [submit(executor, fetch_page, current_page) for current_page in window]
+                    pages = [future.result() for future in futures]
+            more = merge_review_pages(reviews, pages)
+        return reviews[:wanted]
+    except:
+        print(traceback.format_exc())
+        return None
+
+async def async_get_reviews(product_id, max_result=10, debug=False, client=None, page_size=10, workers=4, profile='full'):
+    product_id = str(product_id)
+    client = client or get_default_async_client()
+    page_size = clamp_page_size(page_size)
+    workers = max(1, workers)
+
+    async def fetch_page(current_page):
+        response = await client.post(
+            REVIEWS_PATH,
+            endpoint='reviews',
+            headers=reviews_headers(),
+            json_data=reviews_payload(product_id, current_page, page_size, profile),
         )
-        result_json = response.json()
-        has_next = result_json.get('data', {}).get('productrevGetProductReviewList', {}).get('hasNext', False)
-        current_result =  extract_reviews(result_json)
-        if current_result:
-            result_count += len(current_result)
-            if result_count >= max_result:
-                return current_result
-
-            if debug:
-                for line in current_result:
-                    review_message = line.message.replace('\n','')[0:40]
-                    logger.reviews(f"{line.feedback_id} - {review_message}...")
-
-            next_result = get_reviews(
-                    product_id = product_id,
-                    max_result = max_result,
-                    page = page+1,
-                    result_count = result_count,
-                    debug = debug
-                )
-            return current_result+next_result
-        return current_result
+        return timed_extract(client, 'reviews', parse_reviews_page, timed_decode(client, 'reviews', response), debug)
+
+    try:
+        reviews = []
+        more = merge_review_pages(reviews, [await fetch_page(1)])
+        next_page = 2
+        while more and len(reviews) < max_result:
+            window = next_window(next_page, len(reviews), max_result, page_size, workers)
+            next_page = window.stop
+            pages = await asyncio.gather(*(fetch_page(current_page) for current_page in window))
+            more = merge_review_pages(reviews, pages)
+        return reviews[:max_result]
     except:
         print(traceback.format_exc())
-        return None
\ No newline at end of file
+        return None
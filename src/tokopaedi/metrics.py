@@ -0,0 +1,142 @@
+import threading
+import time
+from bisect import bisect_left
+
+from .fast_json import decode_response
+from .cache import store_decoded
+
+# Request metrics. A client built with metrics=<hook> reports every HTTP
+# attempt and cache hit to hook.on_request, and the fetchers report how long
+# decoding and extracting each response took to hook.on_stage. Any object with
+# those two methods works; MetricsHook is a no-op base to subclass and
+# PrometheusMetrics the built-in collector.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+class MetricsHook:
+    def on_request(self, endpoint, status, seconds, size, attempt, from_cache=False):
+        # status is the HTTP status code, or 'error' for a transport failure;
+        # attempt is 0 for the first try and counts up on retries
+        pass
+
+    def on_stage(self, endpoint, stage, seconds):
+        # stage is 'decode' (JSON parsing) or 'extract' (building result types)
+        pass
+
+def timed_decode(client, endpoint, response):
+    # Every fetcher decodes through here, so this is also where a fresh
+    # response is written to the client's cache, without decoding it twice
+    metrics = getattr(client, 'metrics', None)
+    if metrics is None:
+        data = decode_response(response)
+    else:
+        start = time.perf_counter()
+        data = decode_response(response)
+        metrics.on_stage(endpoint, 'decode', time.perf_counter() - start)
+    store_decoded(client, endpoint, response, data)
+    return data
+
+def timed_extract(client, endpoint, extractor, *args, **kwargs):
+    metrics = getattr(client, 'metrics', None)
+    if metrics is None:
+        return extractor(*args, **kwargs)
+    start = time.perf_counter()
+    result = extractor(*args, **kwargs)
+    metrics.on_stage(endpoint, 'extract', time.perf_counter() - start)
+    return result
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+def format_labels(labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels)
+
+class PrometheusMetrics(MetricsHook):
+    # In-process collector rendering the Prometheus text exposition format.
+    # Serve render() from your own /metrics handler or write it to a file for
+    # node_exporter's textfile collector with write(path).
+    def __init__(self, prefix='tokopaedi'):
+        self.prefix = prefix
+        self.counters = {}
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def on_request(self, endpoint, status, seconds, size, attempt, from_cache=False):
+        endpoint = endpoint or 'unknown'
+        with self.lock:
+            if from_cache:
+                self.inc('cache_hits_total', (('endpoint', endpoint),))
+                return
+            self.inc('requests_total', (('endpoint', endpoint), ('status', str(status))))
+            if attempt:
+                self.inc('retries_total', (('endpoint', endpoint),))
+            self.inc('response_bytes_total', (('endpoint', endpoint),), size)
+            self.observe('request_duration_seconds', (('endpoint', endpoint),), seconds, LATENCY_BUCKETS)
+            self.observe('response_size_bytes', (('endpoint', endpoint),), size, SIZE_BUCKETS)
+
+    def on_stage(self, endpoint, stage, seconds):
+        with self.lock:
+            self.observe(f'{stage}_duration_seconds', (('endpoint', endpoint or 'unknown'),), seconds, STAGE_BUCKETS)
+
+    def counter(self, name, **labels):
+        return self.counters.get((name, tuple(labels.items())), 0)
+
+    def render(self):
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+            seen = set()
+            for (name, labels), value in counters:
+                metric = f'{self.prefix}_{name}'
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f'# TYPE {metric} counter')
+                lines.append(f'{metric}{{{format_labels(labels)}}} {value}')
+            for (name, labels), histogram in histograms:
+                metric = f'{self.prefix}_{name}'
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f'# TYPE {metric} histogram')
+                label_text = format_labels(labels)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{label_text},le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{{label_text}}} {histogram.sum}')
+                lines.append(f'{metric}_count{{{label_text}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+
+    def __repr__(self):
+        return f"<PrometheusMetrics series={len(self.counters) + len(self.histograms)}>"
@@ -0,0 +1,151 @@
+import json
+import sqlite3
+import threading
+import time
+
+from .tokopaedi_types import ProductChange
+from .get_product import get_product_batch
+
+# Scalar ProductData fields watched by PriceMonitor; variant price and stock
+# are tracked per variant on top of these
+TRACKED_FIELDS = ('product_price', 'total_stock', 'sold_count', 'product_status')
+VARIANT_FIELDS = ('price', 'stock')
+
+def variant_key(variant):
+    return '-'.join(str(x) for x in variant.option_ids or []) or variant.option_name
+
+def snapshot(product):
+    # Flat {field: value} view of the tracked fields of one ProductData
+    values = {field: getattr(product, field) for field in TRACKED_FIELDS}
+    for variant in product.variants or []:
+        key = variant_key(variant)
+        for field in VARIANT_FIELDS:
+            values[f'variant.{key}.{field}'] = getattr(variant, field)
+    return values
+
+def diff(old, new):
+    # {field: [old, new]} for every field that changed, appeared or vanished
+    return {
+        field: [old.get(field), new.get(field)]
+        for field in old.keys() | new.keys()
+        if old.get(field) != new.get(field)
+    }
+
+class PriceMonitor:
+    # Change-only price/stock monitor backed by SQLite.
+    #
+    # `latest` holds one current snapshot per product (overwritten in place),
+    # `deltas` one compact row per observed change holding only the new values
+    # of the fields that changed. The first sighting of a product stores its
+    # full snapshot as a first_seen delta, so history() can replay any
+    # product's state over time without storing full ProductData copies.
+    def __init__(self, path='tokopaedi_monitor.sqlite'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.failed = []
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS latest ('
+            'product_id TEXT PRIMARY KEY, snapshot TEXT, updated REAL)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS deltas ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, product_id TEXT, ts REAL, first_seen INTEGER, delta TEXT)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS deltas_product ON deltas (product_id, ts)')
+        self.conn.commit()
+
+    def latest(self, product_id):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT snapshot FROM latest WHERE product_id = ?', (str(product_id),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def observe(self, product, timestamp=None):
+        # Compares one fetched ProductData with its stored snapshot. Returns a
+        # ProductChange (and persists the delta) or None when nothing changed.
+        product_id = str(product.product_id)
+        timestamp = timestamp if timestamp is not None else time.time()
+        current = snapshot(product)
+        previous = self.latest(product_id)
+        changes = diff(previous or {}, current)
+        if previous is not None and not changes:
+            return None
+
+        delta = {field: new for field, (old, new) in changes.items()}
+        with self.lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO latest (product_id, snapshot, updated) VALUES (?, ?, ?)',
+                (product_id, json.dumps(current, separators=(',', ':')), timestamp),
+            )
+            self.conn.execute(
+                'INSERT INTO deltas (product_id, ts, first_seen, delta) VALUES (?, ?, ?, ?)',
+                (product_id, timestamp, previous is None, json.dumps(delta, separators=(',', ':'))),
+            )
+            self.conn.commit()
+        return ProductChange(product_id, timestamp, changes, first_seen=previous is None)
+
+    def check(self, watchlist, workers=8, client=None, on_change=None, profile='pricing', debug=False):
+        # Fetches the watchlist concurrently and returns the ProductChange
+        # events of this round. on_change(event) fires as each one is stored.
+        # Products that could not be fetched are left untouched and their
+        # ProductOutcome is kept in self.failed.
+        events = []
+        self.failed = []
+
+        def settle(outcome):
+            if not outcome.ok:
+                self.failed.append(outcome)
+                return
+            event = self.observe(outcome.product)
+            if event is not None:
+                events.append(event)
+                if on_change:
+                    on_change(event)
+
+        get_product_batch(
+            watchlist, workers=workers, debug=debug, client=client,
+            on_outcome=settle, lazy=True, profile=profile,
+        )
+        return events
+
+    def run(self, watchlist, interval=3600, rounds=None, **kwargs):
+        # Re-checks the watchlist every `interval` seconds, `rounds` times or
+        # forever; keyword arguments go to check()
+        done = 0
+        while rounds is None or done < rounds:
+            started = time.monotonic()
+            self.check(watchlist, **kwargs)
+            done += 1
+            if rounds is None or done < rounds:
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def history(self, product_id):
+        # [(timestamp, snapshot)] for every stored change, oldest first
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT ts, delta FROM deltas WHERE product_id = ? ORDER BY ts, id', (str(product_id),)
+            ).fetchall()
+        state = {}
+        states = []
+        for ts, delta in rows:
+            for field, value in json.loads(delta).items():
+                if value is None:
+                    state.pop(field, None)
+                else:
+                    state[field] = value
+            states.append((ts, dict(state)))
+        return states
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"<PriceMonitor path={self.path!r}>"
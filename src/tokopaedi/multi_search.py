@@ -0,0 +1,87 @@
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .tokopaedi_types import SearchResults
+from .search import search_page, build_base_param, logger
+from .client import get_default_client
+from .checkpoint import search_key
+from .tracing import submit
+
+def search_many(keywords, max_result_per_keyword=100, workers=8, filters=None, debug=False, client=None, journal=None, profile='full'):
+    # Crawls many keywords concurrently over one client. Every keyword has at
+    # most one page in flight and goes to the back of the queue once its page
+    # lands, so pages are interleaved round-robin and a deep keyword cannot
+    # starve the others. Products are deduped across keywords (first keyword
+    # to return one wins) and results.keyword_matches maps each product_id to
+    # every keyword that returned it, so shared products are enriched once.
+    client = client or get_default_client()
+    keywords = list(dict.fromkeys(keywords))
+    results = SearchResults()
+    matches = results.keyword_matches
+    seen = set()
+
+    base_params = {}
+    keys = {}
+    cursors = {}
+    counts = {}
+    queue = deque()
+    for keyword in keywords:
+        base_param = build_base_param(keyword, filters)
+        key = keys[keyword] = search_key(keyword, base_param)
+        if journal and journal.is_search_done(key):
+            continue
+        base_params[keyword] = base_param
+        cursors[keyword] = journal.cursor(key) if journal else None
+        counts[keyword] = journal.result_count(key) if journal else 0
+        if journal:
+            seen.update(journal.seen_ids(key))
+        queue.append(keyword)
+
+    def finish(keyword):
+        if journal:
+            journal.record_search_done(keys[keyword])
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        while queue or running:
+            while queue and len(running) < workers:
+                keyword = queue.popleft()
+                future = submit(executor, search_page, client, keyword, base_params[keyword], cursors[keyword], profile)
+                running[future] = keyword
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                keyword = running.pop(future)
+                try:
+                    page, cursor, _ = future.result()
+                except Exception:
+                    # drop the keyword, the others carry on; it is not marked
+                    # done, so a journal resumes it from its last cursor
+                    print(traceback.format_exc())
+                    continue
+
+                counts[keyword] += len(page)
+                page_ids = []
+                for item in page:
+                    keyword_list = matches.setdefault(item.product_id, [])
+                    if keyword not in keyword_list:
+                        keyword_list.append(keyword)
+                    if item.product_id in seen:
+                        continue
+                    seen.add(item.product_id)
+                    page_ids.append(item.product_id)
+                    results.append(item)
+                    if debug:
+                        logger.search(f'[{keyword}] {item.product_id} - {item.name[0:40]}...')
+
+                if page:
+                    cursors[keyword] = cursor
+                    if journal:
+                        journal.record_page(keys[keyword], cursor, page_ids, counts[keyword])
+                if page and cursor and counts[keyword] < max_result_per_keyword:
+                    queue.append(keyword)
+                else:
+                    finish(keyword)
+
+    return results
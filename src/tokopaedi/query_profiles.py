@@ -0,0 +1,136 @@
+from functools import lru_cache
+
+# Field-selection profiles for the three GraphQL operations.
+#
+#   minimal - only the fields the extractors actually read, minus nested lists
+#             that are expensive to ship (PDP media and variants)
+#   pricing - minimal plus what price/stock monitoring needs (PDP variants)
+#   full    - the original selection set captured from the iOS app
+#
+# Selections are nested lists: a string is a leaf field, a (name, [...]) pair
+# a field with a sub-selection. They are rendered once per profile and cached.
+
+PROFILES = ('minimal', 'pricing', 'full')
+
+def render(selection):
+    parts = []
+    for field in selection:
+        if isinstance(field, tuple):
+            name, children = field
+            parts.append(f"{name} {{\n{render(children)}\n}}")
+        else:
+            parts.append(field)
+    return "\n".join(parts)
+
+def check_profile(profile):
+    if profile not in PROFILES:
+        raise ValueError(f"unknown profile {profile!r}, expected one of {PROFILES}")
+
+SEARCH_PRODUCT_FIELDS = [
+    'id',
+    'name',
+    'url',
+    ('mediaURL', ['image700']),
+    ('shop', ['id', 'name', 'url', 'city']),
+    ('badge', ['title', 'url']),
+    ('price', ['text', 'number', 'original']),
+    ('category', ['name']),
+    'rating',
+    ('stock', ['sold', 'ttsSKUID']),
+]
+
+PDP_BASIC_INFO_FIELDS = [
+    'productID',
+    ('category', ['name', ('detail', ['name'])]),
+    ('menu', ['name', 'url']),
+    'shopID',
+    'shopName',
+    'url',
+    'weight',
+    'weightUnit',
+    'status',
+    ('txStats', ['countSold']),
+    ('stats', ['rating', 'countTalk', 'countReview']),
+    'totalStockFmt',
+    ('shopMultilocation', ['cityName']),
+]
+
+PDP_CONTENT_FRAGMENT = ('... on pdpDataProductContent', [
+    'name',
+    ('price', ['value', 'priceFmt', 'slashPriceFmt', 'discPercentage']),
+])
+
+PDP_MEDIA_FRAGMENT = ('... on pdpDataProductMedia', [
+    ('media', ['URLOriginal', 'URLThumbnail', 'URLMaxRes']),
+])
+
+PDP_VARIANT_FRAGMENT = ('... on pdpDataProductVariant', [
+    ('variants', ['productVariantID', 'name', ('option', ['value'])]),
+    ('children', [
+        'price',
+        'priceFmt',
+        'discPercentage',
+        'optionID',
+        'productName',
+        'productURL',
+        ('picture', ['url']),
+        ('stock', ['stock']),
+    ]),
+])
+
+REVIEW_FIELDS = [
+    ('list', [
+        'feedbackID',
+        'variantName',
+        'message',
+        'productRating',
+        'reviewCreateTimestamp',
+        ('reviewResponse', ['message', 'createTime']),
+        ('user', ['fullName', 'url']),
+        ('imageAttachments', ['imageUrl']),
+        ('videoAttachments', ['attachmentID', 'videoUrl']),
+        ('likeDislike', ['totalLike']),
+    ]),
+    'hasNext',
+]
+
+@lru_cache(maxsize=None)
+def search_query(profile):
+    check_profile(profile)
+    from .search import SEARCH_QUERY
+    if profile == 'full':
+        return SEARCH_QUERY
+    # searchProductV5 only; the navigation, inspiration, ads and last-filter
+    # blocks of the full query are never read by search_extractor.
+    # totalData is what sharded_search uses to spot capped shards.
+    selection = [('searchProductV5(params: $params)', [
+        ('header', ['totalData', 'additionalParams']),
+        ('data', [('products', SEARCH_PRODUCT_FIELDS)]),
+    ])]
+    return f"query Search_SearchProduct($params: String!) {{\n{render(selection)}\n}}"
+
+@lru_cache(maxsize=None)
+def product_query(profile):
+    check_profile(profile)
+    from .get_product import PDP_QUERY
+    if profile == 'full':
+        return PDP_QUERY
+    fragments = [PDP_CONTENT_FRAGMENT]
+    if profile == 'pricing':
+        fragments.append(PDP_VARIANT_FRAGMENT)
+    selection = [
+        ('basicInfo', PDP_BASIC_INFO_FIELDS),
+        ('components', ['name', 'type', ('data', fragments)]),
+    ]
+    header = PDP_QUERY.split('{', 2)
+    # reuse the operation and pdpGetLayout(...) signature of the full query
+    return f"{header[0]}{{{header[1]}{{\n{render(selection)}\n}}\n}}"
+
+@lru_cache(maxsize=None)
+def reviews_query(profile):
+    check_profile(profile)
+    from .get_reviews import REVIEWS_QUERY
+    if profile == 'full':
+        return REVIEWS_QUERY
+    header = REVIEWS_QUERY.split('{', 2)
+    return f"{header[0]}{{{header[1]}{{\n{render(REVIEW_FIELDS)}\n}}\n}}"
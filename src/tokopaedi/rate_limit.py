@@ -0,0 +1,117 @@
+import random
+import threading
+import time
+from collections import deque
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class TokenBucket:
+    # Classic token bucket: `rate` tokens per second, holding at most `burst`.
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        # Takes one token and returns how long the caller must wait before
+        # using it. Reservations queue up, so callers never race for tokens.
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def set_rate(self, rate):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.rate = float(rate)
+
+class RateLimiter:
+    # Token-bucket limiter shared by every endpoint of a client. Each endpoint
+    # ('search', 'product', 'reviews') gets its own bucket, configured through
+    # `endpoints={'reviews': 10}` or falling back to `rate`.
+    #
+    # The rate adapts AIMD-style: when more than `error_threshold` of the last
+    # `window` requests to an endpoint failed (429/5xx/transport error) its rate
+    # is halved, down to `min_rate`; every clean window raises it again by
+    # `increase` up to the configured rate.
+    def __init__(self, rate=5.0, burst=None, endpoints=None, min_rate=0.5,
+                 window=20, error_threshold=0.2, increase=0.5):
+        self.rate = rate
+        self.burst = burst
+        self.endpoints = endpoints or {}
+        self.min_rate = min_rate
+        self.window = window
+        self.error_threshold = error_threshold
+        self.increase = increase
+        self.buckets = {}
+        self.outcomes = {}
+        self.lock = threading.Lock()
+
+    def max_rate(self, endpoint):
+        return self.endpoints.get(endpoint, self.rate)
+
+    def bucket(self, endpoint):
+        with self.lock:
+            if endpoint not in self.buckets:
+                self.buckets[endpoint] = TokenBucket(self.max_rate(endpoint), self.burst)
+                self.outcomes[endpoint] = deque(maxlen=self.window)
+            return self.buckets[endpoint]
+
+    def reserve(self, endpoint=None):
+        return self.bucket(endpoint).reserve()
+
+    def acquire(self, endpoint=None):
+        delay = self.reserve(endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, endpoint, ok):
+        bucket = self.bucket(endpoint)
+        with self.lock:
+            outcomes = self.outcomes[endpoint]
+            outcomes.append(ok)
+            if len(outcomes) < self.window:
+                return
+            error_rate = outcomes.count(False) / len(outcomes)
+            if error_rate > self.error_threshold:
+                new_rate = max(self.min_rate, bucket.rate / 2)
+            else:
+                new_rate = min(self.max_rate(endpoint), bucket.rate + self.increase)
+            outcomes.clear()
+        if new_rate != bucket.rate:
+            bucket.set_rate(new_rate)
+
+    def current_rate(self, endpoint=None):
+        return self.bucket(endpoint).rate
+
+class RetryPolicy:
+    # Retries 429/5xx responses and transport errors with exponential backoff
+    # and full jitter: attempt n sleeps uniform(0, min(max_backoff, backoff * 2**n)).
+    # A Retry-After header on the response takes precedence.
+    def __init__(self, max_retries=3, backoff=0.5, max_backoff=30.0, statuses=RETRY_STATUSES):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+
+    def should_retry(self, status_code):
+        return status_code in self.statuses
+
+    def delay(self, attempt, response=None):
+        retry_after = None
+        if response is not None:
+            retry_after = (getattr(response, 'headers', None) or {}).get('Retry-After')
+        if retry_after:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
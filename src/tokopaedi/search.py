@@ -1,4 +1,3 @@
-from curl_cffi import requests
 import json
 import traceback
 from urllib.parse import quote, parse_qs, urlencode
@@ -9,29 +8,34 @@ from typing import Optional
 
 from .tokopaedi_types import SearchResults, ProductSearchResult, TokopaediShop
 from .custom_logging import setup_custom_logging
-from .get_fingerprint import randomize_fp
+from .client import get_default_client, get_default_async_client
+from .metrics import timed_decode, timed_extract
+from .query_profiles import search_query
+from .checkpoint import search_key
 
 logger = setup_custom_logging()
 
 
 def search_extractor(result):
-    if result['products']:
+    if result.get('products'):
         product_result = []
         for product in result['products']:
-            price_data = product.get('price',{})
-            shop_info = product.get('shop')
+            # trimmed query profiles may leave nested objects out or null
+            price_data = product.get('price') or {}
+            shop_info = product.get('shop') or {}
+            stock_info = product.get('stock') or {}
 
             product_id = product.get('id')
-            product_sku = product.get('stock', {}).get('ttsSKUID') 
+            product_sku = stock_info.get('ttsSKUID')
             name = product.get('name')
-            category = product.get('category',{}).get('name')
+            category = (product.get('category') or {}).get('name')
             url = product.get('url')
-            sold_count = product.get('stock',{}).get('sold')
+            sold_count = stock_info.get('sold')
             original_price = price_data.get('original')
             real_price = price_data.get('number')
             real_price_text = price_data.get('text')
             rating = float(product.get('rating')) if product.get('rating') else None
-            image = product.get('mediaURL',{}).get('image700')
+            image = (product.get('mediaURL') or {}).get('image700')
 
             shop_id = shop_info.get('id')
             shop_name = shop_info.get('name')
@@ -83,12 +87,15 @@ def merge_params(original, additional=None):
 
     return "&".join(f"{k}={quote(str(v), safe=',')}" for k, v in merged.items())
 
-def search(keyword="zenbook 14 32gb", max_result=100, result_count=0, base_param=None, next_param=None, filters=None, debug=False):
-    headers = {
+SEARCH_PATH = '/graphql/SearchResult/getProductResult'
+
+SEARCH_QUERY = 'query Search_SearchProduct($params: String!, $query: String!) {\nglobal_search_navigation(keyword: $query, size: 5, device: "ios", params: $params){\ndata {\nsource\nkeyword\ntitle\nnav_template\nbackground\nsee_all_applink\nshow_topads\ninfo\nlist {\ncategory_name\nname\ninfo\nimage_url\nsubtitle\nstrikethrough\nbackground_url\nlogo_url\napplink\ncomponent_id\n}\ncomponent_id\ntracking_option\n}\n}\nsearchInspirationCarouselV2(params: $params){\nprocess_time\ndata {\ntitle\ntype\nposition\nlayout\ntracking_option\ncolor\noptions {\ntitle\nsubtitle\nicon_subtitle\napplink\nbanner_image_url\nbanner_applink_url\nidentifier\nmeta\ncomponent_id\ncard_button {\ntitle\napplink\n}\nbundle {\nshop {\nname\nurl\n}\ncount_sold\nprice\noriginal_price\ndiscount\ndiscount_percentage\n}\nproduct {\nid\nttsProductID\nname\nprice\nprice_str\nimage_url\nrating\ncount_review\napplink\ndescription\noriginal_price\ndiscount\ndiscount_percentage\nrating_average\nbadges {\ntitle\nimage_url\nshow\n}\nshop {\nid\nname\ncity\nttsSellerID\n}\nlabel_groups {\nposition\ntitle\ntype\nurl\nstyles {\nkey\nvalue\n}\n}\nfreeOngkir {\nisActive\nimage_url\n}\nads {\nid\nproductClickUrl\nproductWishlistUrl\nproductViewUrl\n}\nwishlist\ncomponent_id\ncustomvideo_url\nlabel\nbundle_id\nparent_id\nmin_order\ncategory_id\nstockbar {\npercentage_value\nvalue\ncolor\nttsSkuID\n}\nwarehouse_id_default\nsold\n}\n}\n}\n}\nsearchInspirationWidget(params: $params){\ndata {\ntitle\nheader_title\nheader_subtitle\ntype\nposition\nlayout\noptions {\ntext\nimg\ncolor\napplink\nmulti_filters{\nkey\nname\nvalue\nval_min\nval_max\n}\ncomponent_id\n}\ntracking_option\ninput_type\n}\n}\nproductAds: displayAdsV3(displayParams: $params) {\nstatus {\nerror_code\nmessage\n}\nheader {\nprocess_time\ntotal_data\n}\ndata{\nid\nad_ref_key\nredirect\nsticker_id\nsticker_image\nproduct_click_url\nproduct_wishlist_url\nshop_click_url\ntag\ncreative_id\nlog_extra\nproduct{\nid\ntts_product_id\ntts_sku_id\nparent_id\nname\nwishlist\nimage{\nm_url\ns_url\nxs_url\nm_ecs\ns_ecs\nxs_ecs\n}\nuri\nrelative_uri\nprice_format\nprice_range\ncampaign {\ndiscount_percentage\noriginal_price\n}\nwholesale_price {\nprice_format\nquantity_max_format\nquantity_min_format\n}\ncount_talk_format\ncount_review_format\ncategory {\nid\n}\ncategory_breadcrumb\nproduct_preorder\nproduct_wholesale\nproduct_item_sold_payment_verified\nfree_return\nproduct_cashback\nproduct_new_label\nproduct_cashback_rate\nproduct_rating\nproduct_rating_format\nlabels {\ncolor\ntitle\n}\nfree_ongkir {\nis_active\nimg_url\n}\nlabel_group {\nposition\ntype\ntitle\nurl\nstyle {\nkey\nvalue\n}\n}\ntop_label\nbottom_label\nproduct_minimum_order\ncustomvideo_url\n}\nshop{\nid\ntts_seller_id\nname\ndomain\nlocation\ncity\ngold_shop\ngold_shop_badge\nlucky_shop\nuri\nshop_rating_avg\nowner_id\nis_owner\nbadges{\ntitle\nimage_url\nshow\n}\n}\napplinks\n}\ntemplate {\nis_ad\n}\n}\nsearchProductV5(params: $params) {\nheader {\ntotalData\nresponseCode\nkeywordProcess\nkeywordIntention\ncomponentID\nmeta {\nproductListType\nhasPostProcessing\nhasButtonATC\ndynamicFields\n}\nisQuerySafe\nadditionalParams\nautocompleteApplink\nbackendFilters\nbackendFiltersToggle\n}\ndata {\ntotalDataText\nbanner {\nposition\ntext\napplink\nimageURL\ncomponentID\ntrackingOption\n}\nredirection {\napplink\n}\nrelated {\nrelatedKeyword\nposition\ntrackingOption\notherRelated {\nkeyword\napplink\ncomponentID\nproducts {\nid\nname\napplink\nmediaURL {\nimage\n}\nshop {\nname\ncity\n}\nbadge {\ntitle\nurl\n}\nprice {\ntext\nnumber\n}\nfreeShipping {\nurl\n}\nlabelGroups {\nid\nposition\ntitle\ntype\nurl\nstyles {\nkey\nvalue\n}\n}\nrating\nwishlist\nads {\nid\nproductClickURL\nproductViewURL\nproductWishlistURL\n}\nmeta {\nparentID\nwarehouseID\ncomponentID\nisImageBlurred\n}\n}\n}\n}\nsuggestion {\ncurrentKeyword\nsuggestion\nquery\ntext\ncomponentID\ntrackingOption\n}\nticker {\nid\ntext\nquery\napplink\ncomponentID\ntrackingOption\n}\nviolation {\nheaderText\ndescriptionText\nimageURL\nctaApplink\nbuttonText\nbuttonType\n}\nproducts {\nid\nttsProductID\nname\nurl\napplink\nmediaURL {\nimage\nimage300\nimage500\nimage700\nvideoCustom\n}\nshop {\nid\nname\nurl\ncity\nttsSellerID\n}\nbadge {\ntitle\nurl\n}\nprice {\ntext\nnumber\nrange\noriginal\ndiscountPercentage\n}\nfreeShipping {\nurl\n}\nlabelGroups {\nid\nposition\ntitle\ntype\nurl\nstyles {\nkey\nvalue\n}\n}\nlabelGroupsVariant {\ntitle\ntype\ntypeVariant\nhexColor\n}\ncategory {\nid\nname\nbreadcrumb\ngaKey\n}\nrating\nwishlist\nads {\nid\nproductClickURL\nproductViewURL\nproductWishlistURL\ntag\ncreativeID\nlogExtra\n}\nmeta {\nparentID\nwarehouseID\nisPortrait\nisImageBlurred\ndynamicFields\n}\nstock {\nsold\nttsSKUID\n}\n}\nshopWidget {\nheadline {\nbadge {\nurl\n}\nshop {\nid\nimageShop {\nsURL\n}\nCity\nname\nratingScore\nttsSellerID\nproducts {\nid\nttsProductID\nname\napplink\nmediaURL {\nimage300\n}\nprice {\ntext\noriginal\ndiscountPercentage\n}\nfreeShipping {\nurl\n}\nlabelGroups {\nposition\ntitle\ntype\nstyles {\nkey\nvalue\n}\nurl\n}\nrating\nmeta {\nparentID\ndynamicFields\n}\nshop {\nttsSellerID\n}\nstock {\nttsSKUID\n}\n}\n}\n}\nmeta {\napplinks\n}\n}\nfilters {\ntitle\ntemplate_name: templateName\nisNew\nsubTitle: subtitle\nsearch: searchInfo {\nsearchable\nplaceholder\n}\noptions {\nname\nkey\nvalue\nicon\nisPopular\nisNew\nhexColor\ninputType\nvalMin\nvalMax\nDescription: description\nchild {\nname\nkey\nvalue\nisPopular\nchild {\nname\nkey\nvalue\n}\n}\n}\n}\nquickFilters {\ntitle\nchip_name: chipName\noptions {\nname\nkey\nvalue\nicon\nis_popular: isPopular\nis_new: isNew\nhex_color: hexColor\ninput_type: inputType\nimage_url_active: imageURLActive\nimage_url_inactive: imageURLInactive\n}\n}\nsorts {\nname\nkey\nvalue\n}\n}\n}\nfetchLastFilter(param: $params) {\ndata {\ntitle\ndescription\ncategory_id_l2\napplink\ntracking_option\nfilters {\ntitle\nkey\nname\nvalue\n}\ncomponent_id\n}\n}\n}'
+
+def search_headers():
+    return {
         'Host': 'gql.tokopedia.com',
         'Os_type': '2',
-        'Fingerprint-Data': randomize_fp(),
-        'X-Tkpd-Path': '/graphql/SearchResult/getProductResult',
+        'X-Tkpd-Path': SEARCH_PATH,
         'X-Method': 'POST',
         'X-Device': 'ios-2.318.0',
         'Request-Method': 'POST',
@@ -106,55 +113,184 @@ def search(keyword="zenbook 14 32gb", max_result=100, result_count=0, base_param
         'Bd-Device-Id': '7132999401249080838',
     }
 
-    if not base_param:
-        base_param = f'user_warehouseId=0&user_shopId=0&user_postCode=10110&srp_initial_state=false&breadcrumb=true&ep=product&user_cityId=0&q={quote(keyword)}&related=true&source=search&srp_enter_method=normal_search&enter_method=normal_search&l_name=sre&user_districtId=0&srp_feature_id=&catalog_rows=0&page=1&srp_component_id=02.01.00.00&ob=0&srp_sug_type=&src=search&with_template=true&show_adult=false&srp_direct_middle_page=false&channel=product%20search&rf=false&navsource=home&use_page=true&dep_id=&device=ios'
-
+def build_base_param(keyword, filters=None):
+    base_param = f'user_warehouseId=0&user_shopId=0&user_postCode=10110&srp_initial_state=false&breadcrumb=true&ep=product&user_cityId=0&q={quote(keyword)}&related=true&source=search&srp_enter_method=normal_search&enter_method=normal_search&l_name=sre&user_districtId=0&srp_feature_id=&catalog_rows=0&page=1&srp_component_id=02.01.00.00&ob=0&srp_sug_type=&src=search&with_template=true&show_adult=false&srp_direct_middle_page=false&channel=product%20search&rf=false&navsource=home&use_page=true&dep_id=&device=ios'
     if filters:
         base_param = merge_params(base_param, filters_to_query(filters))
+    return base_param
 
+def search_payload(keyword, base_param, next_param=None, profile='full'):
     json_data = {
-        'query': 'query Search_SearchProduct($params: String!, $query: String!) {\nglobal_search_navigation(keyword: $query, size: 5, device: "ios", params: $params){\ndata {\nsource\nkeyword\ntitle\nnav_template\nbackground\nsee_all_applink\nshow_topads\ninfo\nlist {\ncategory_name\nname\ninfo\nimage_url\nsubtitle\nstrikethrough\nbackground_url\nlogo_url\napplink\ncomponent_id\n}\ncomponent_id\ntracking_option\n}\n}\nsearchInspirationCarouselV2(params: $params){\nprocess_time\ndata {\ntitle\ntype\nposition\nlayout\ntracking_option\ncolor\noptions {\ntitle\nsubtitle\nicon_subtitle\napplink\nbanner_image_url\nbanner_applink_url\nidentifier\nmeta\ncomponent_id\ncard_button {\ntitle\napplink\n}\nbundle {\nshop {\nname\nurl\n}\ncount_sold\nprice\noriginal_price\ndiscount\ndiscount_percentage\n}\nproduct {\nid\nttsProductID\nname\nprice\nprice_str\nimage_url\nrating\ncount_review\napplink\ndescription\noriginal_price\ndiscount\ndiscount_percentage\nrating_average\nbadges {\ntitle\nimage_url\nshow\n}\nshop {\nid\nname\ncity\nttsSellerID\n}\nlabel_groups {\nposition\ntitle\ntype\nurl\nstyles {\nkey\nvalue\n}\n}\nfreeOngkir {\nisActive\nimage_url\n}\nads {\nid\nproductClickUrl\nproductWishlistUrl\nproductViewUrl\n}\nwishlist\ncomponent_id\ncustomvideo_url\nlabel\nbundle_id\nparent_id\nmin_order\ncategory_id\nstockbar {\npercentage_value\nvalue\ncolor\nttsSkuID\n}\nwarehouse_id_default\nsold\n}\n}\n}\n}\nsearchInspirationWidget(params: $params){\ndata {\ntitle\nheader_title\nheader_subtitle\ntype\nposition\nlayout\noptions {\ntext\nimg\ncolor\napplink\nmulti_filters{\nkey\nname\nvalue\nval_min\nval_max\n}\ncomponent_id\n}\ntracking_option\ninput_type\n}\n}\nproductAds: displayAdsV3(displayParams: $params) {\nstatus {\nerror_code\nmessage\n}\nheader {\nprocess_time\ntotal_data\n}\ndata{\nid\nad_ref_key\nredirect\nsticker_id\nsticker_image\nproduct_click_url\nproduct_wishlist_url\nshop_click_url\ntag\ncreative_id\nlog_extra\nproduct{\nid\ntts_product_id\ntts_sku_id\nparent_id\nname\nwishlist\nimage{\nm_url\ns_url\nxs_url\nm_ecs\ns_ecs\nxs_ecs\n}\nuri\nrelative_uri\nprice_format\nprice_range\ncampaign {\ndiscount_percentage\noriginal_price\n}\nwholesale_price {\nprice_format\nquantity_max_format\nquantity_min_format\n}\ncount_talk_format\ncount_review_format\ncategory {\nid\n}\ncategory_breadcrumb\nproduct_preorder\nproduct_wholesale\nproduct_item_sold_payment_verified\nfree_return\nproduct_cashback\nproduct_new_label\nproduct_cashback_rate\nproduct_rating\nproduct_rating_format\nlabels {\ncolor\ntitle\n}\nfree_ongkir {\nis_active\nimg_url\n}\nlabel_group {\nposition\ntype\ntitle\nurl\nstyle {\nkey\nvalue\n}\n}\ntop_label\nbottom_label\nproduct_minimum_order\ncustomvideo_url\n}\nshop{\nid\ntts_seller_id\nname\ndomain\nlocation\ncity\ngold_shop\ngold_shop_badge\nlucky_shop\nuri\nshop_rating_avg\nowner_id\nis_owner\nbadges{\ntitle\nimage_url\nshow\n}\n}\napplinks\n}\ntemplate {\nis_ad\n}\n}\nsearchProductV5(params: $params) {\nheader {\ntotalData\nresponseCode\nkeywordProcess\nkeywordIntention\ncomponentID\nmeta {\nproductListType\nhasPostProcessing\nhasButtonATC\ndynamicFields\n}\nisQuerySafe\nadditionalParams\nautocompleteApplink\nbackendFilters\nbackendFiltersToggle\n}\ndata {\ntotalDataText\nbanner {\nposition\ntext\napplink\nimageURL\ncomponentID\ntrackingOption\n}\nredirection {\napplink\n}\nrelated {\nrelatedKeyword\nposition\ntrackingOption\notherRelated {\nkeyword\napplink\ncomponentID\nproducts {\nid\nname\napplink\nmediaURL {\nimage\n}\nshop {\nname\ncity\n}\nbadge {\ntitle\nurl\n}\nprice {\ntext\nnumber\n}\nfreeShipping {\nurl\n}\nlabelGroups {\nid\nposition\ntitle\ntype\nurl\nstyles {\nkey\nvalue\n}\n}\nrating\nwishlist\nads {\nid\nproductClickURL\nproductViewURL\nproductWishlistURL\n}\nmeta {\nparentID\nwarehouseID\ncomponentID\nisImageBlurred\n}\n}\n}\n}\nsuggestion {\ncurrentKeyword\nsuggestion\nquery\ntext\ncomponentID\ntrackingOption\n}\nticker {\nid\ntext\nquery\napplink\ncomponentID\ntrackingOption\n}\nviolation {\nheaderText\ndescriptionText\nimageURL\nctaApplink\nbuttonText\nbuttonType\n}\nproducts {\nid\nttsProductID\nname\nurl\napplink\nmediaURL {\nimage\nimage300\nimage500\nimage700\nvideoCustom\n}\nshop {\nid\nname\nurl\ncity\nttsSellerID\n}\nbadge {\ntitle\nurl\n}\nprice {\ntext\nnumber\nrange\noriginal\ndiscountPercentage\n}\nfreeShipping {\nurl\n}\nlabelGroups {\nid\nposition\ntitle\ntype\nurl\nstyles {\nkey\nvalue\n}\n}\nlabelGroupsVariant {\ntitle\ntype\ntypeVariant\nhexColor\n}\ncategory {\nid\nname\nbreadcrumb\ngaKey\n}\nrating\nwishlist\nads {\nid\nproductClickURL\nproductViewURL\nproductWishlistURL\ntag\ncreativeID\nlogExtra\n}\nmeta {\nparentID\nwarehouseID\nisPortrait\nisImageBlurred\ndynamicFields\n}\nstock {\nsold\nttsSKUID\n}\n}\nshopWidget {\nheadline {\nbadge {\nurl\n}\nshop {\nid\nimageShop {\nsURL\n}\nCity\nname\nratingScore\nttsSellerID\nproducts {\nid\nttsProductID\nname\napplink\nmediaURL {\nimage300\n}\nprice {\ntext\noriginal\ndiscountPercentage\n}\nfreeShipping {\nurl\n}\nlabelGroups {\nposition\ntitle\ntype\nstyles {\nkey\nvalue\n}\nurl\n}\nrating\nmeta {\nparentID\ndynamicFields\n}\nshop {\nttsSellerID\n}\nstock {\nttsSKUID\n}\n}\n}\n}\nmeta {\napplinks\n}\n}\nfilters {\ntitle\ntemplate_name: templateName\nisNew\nsubTitle: subtitle\nsearch: searchInfo {\nsearchable\nplaceholder\n}\noptions {\nname\nkey\nvalue\nicon\nisPopular\nisNew\nhexColor\ninputType\nvalMin\nvalMax\nDescription: description\nchild {\nname\nkey\nvalue\nisPopular\nchild {\nname\nkey\nvalue\n}\n}\n}\n}\nquickFilters {\ntitle\nchip_name: chipName\noptions {\nname\nkey\nvalue\nicon\nis_popular: isPopular\nis_new: isNew\nhex_color: hexColor\ninput_type: inputType\nimage_url_active: imageURLActive\nimage_url_inactive: imageURLInactive\n}\n}\nsorts {\nname\nkey\nvalue\n}\n}\n}\nfetchLastFilter(param: $params) {\ndata {\ntitle\ndescription\ncategory_id_l2\napplink\ntracking_option\nfilters {\ntitle\nkey\nname\nvalue\n}\ncomponent_id\n}\n}\n}',
+        'query': search_query(profile),
         'variables': {
             'params': base_param,
             'query': keyword,
         },
     }
+    if profile != 'full':
+        # the trimmed query only declares $params
+        del json_data['variables']['query']
 
     if next_param:
         params = merge_params(base_param, next_param)
         json_data['variables']['params'] = params
+    return json_data
+
+class SearchPageError(Exception):
+    # A search page that failed (an HTTP error left after retries, or a body
+    # without searchProductV5), as opposed to an empty last page
+    pass
+
+def search_page(client, keyword, base_param, next_param=None, profile='full'):
+    # One searchProductV5 page: the extracted products, the additionalParams
+    # cursor for the page after it and the header's totalData (None when the
+    # server did not report one). Raises SearchPageError for a failed page.
+    response = client.post(
+        SEARCH_PATH,
+        endpoint='search',
+        headers=search_headers(),
+        json_data=search_payload(keyword, base_param, next_param, profile),
+    )
+    return parse_search_page(client, response)
+
+def parse_search_page(client, response):
+    if response.status_code != 200:
+        raise SearchPageError(f'HTTP {response.status_code}')
+    result_json = timed_decode(client, 'search', response)
+    search_product = (result_json.get('data') or {}).get('searchProductV5')
+    if not search_product:
+        raise SearchPageError(str(result_json.get('errors') or 'no searchProductV5 in response'))
+    header = search_product.get('header') or {}
+    total = header.get('totalData')
+    return (
+        timed_extract(client, 'search', search_extractor, search_product['data']),
+        header.get('additionalParams'),
+        int(total) if total is not None else None,
+    )
+
+def search_iter(keyword="zenbook 14 32gb", max_result=100, base_param=None, next_param=None, filters=None, debug=False, client=None, journal=None, profile='full'):
+    # Yields unique ProductSearchResult items page by page. Pagination stops
+    # once max_result items have been received or the server runs dry; a
+    # failed page raises SearchPageError instead.
+    # With a CrawlJournal, every finished page is checkpointed and a later
+    # call for the same keyword, filters and base_param resumes from the
+    # saved cursor. The search is only marked done when pagination ends, so
+    # a crawl cut short by a failed page picks up where it stopped.
+    client = client or get_default_client()
+
+    if not base_param:
+        base_param = build_base_param(keyword)
+
+    if filters:
+        base_param = merge_params(base_param, filters_to_query(filters))
+
+    seen = set()
+    result_count = 0
+    if journal:
+        key = search_key(keyword, base_param)
+        if journal.is_search_done(key):
+            return
+        next_param = journal.cursor(key) or next_param
+        result_count = journal.result_count(key)
+        seen = journal.seen_ids(key)
+
+    while result_count < max_result:
+        result, cursor, _ = search_page(client, keyword, base_param, next_param, profile)
+        if not result:
+            break
+        result_count += len(result)
+
+        page_ids = []
+        for item in result:
+            if item.product_id in seen:
+                continue
+            seen.add(item.product_id)
+            page_ids.append(item.product_id)
+            if debug:
+                logger.search(f'{item.product_id} - {item.name[0:40]}...')
+            yield item
 
+        next_param = cursor
+        if journal:
+            journal.record_page(key, next_param, page_ids, result_count)
+        if not next_param:
+            # last page; an empty cursor would restart from page 1
+            break
+
+    if journal:
+        journal.record_search_done(key)
+
+def search(keyword="zenbook 14 32gb", max_result=100, result_count=0, base_param=None, next_param=None, filters=None, debug=False, client=None, journal=None, profile='full'):
+    try:
+        return SearchResults(list(search_iter(
+            keyword=keyword,
+            max_result=max_result - result_count,
+            base_param=base_param,
+            next_param=next_param,
+            filters=filters,
+            debug=debug,
+            client=client,
+            journal=journal,
+            profile=profile
+        )))
+    except:
+        print(traceback.format_exc())
+        return None
+
+async def async_search(keyword="zenbook 14 32gb", max_result=100, base_param=None, next_param=None, filters=None, debug=False, client=None, journal=None, profile='full'):
+    # Coroutine version of search(); pagination and CrawlJournal
+    # checkpointing follow search_iter
+    client = client or get_default_async_client()
+
+    if not base_param:
+        base_param = build_base_param(keyword)
+
+    if filters:
+        base_param = merge_params(base_param, filters_to_query(filters))
+
+    items = []
+    seen = set()
+    result_count = 0
     try:
-        response = requests.post(
-            'https://gql.tokopedia.com/graphql/SearchResult/getProductResult',
-            headers=headers,
-            json=json_data,
-            verify=False,
-        )
-
-        if 'searchProductV5' in response.text:
-            result = response.json()['data']['searchProductV5']['data']
-            result = SearchResults(search_extractor(result))
-            if result:
-                result_count += len(result)
+        if journal:
+            key = search_key(keyword, base_param)
+            if journal.is_search_done(key):
+                return SearchResults()
+            next_param = journal.cursor(key) or next_param
+            result_count = journal.result_count(key)
+            seen = journal.seen_ids(key)
+
+        while result_count < max_result:
+            response = await client.post(
+                SEARCH_PATH,
+                endpoint='search',
+                headers=search_headers(),
+                json_data=search_payload(keyword, base_param, next_param, profile),
+            )
+            result, cursor, _ = parse_search_page(client, response)
+            if not result:
+                break
+            result_count += len(result)
+
+            page_ids = []
+            for item in result:
+                if item.product_id in seen:
+                    continue
+                seen.add(item.product_id)
+                page_ids.append(item.product_id)
                 if debug:
-                    for line in result:
-                        logger.search(f'{line.product_id} - {line.name[0:40]}...')
-                if result_count >= max_result:
-                    return dedupe(result)
-
-                next_param = response.json()['data']['searchProductV5']['header']['additionalParams']
-                next_result = search(
-                    keyword=keyword,
-                    max_result=max_result,
-                    result_count=result_count,
-                    base_param=base_param,
-                    next_param = next_param,
-                    debug = debug
-                )
-                return dedupe(result+next_result)
-
-        return dedupe(result)
+                    logger.search(f'{item.product_id} - {item.name[0:40]}...')
+                items.append(item)
+
+            next_param = cursor
+            if journal:
+                journal.record_page(key, next_param, page_ids, result_count)
+            if not next_param:
+                break
+
+        if journal:
+            journal.record_search_done(key)
+        return SearchResults(items)
     except:
         print(traceback.format_exc())
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,132 @@
+import itertools
+import math
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import replace
+
+from .tokopaedi_types import SearchResults
+from .search import search_page, build_base_param, logger
+from .client import get_default_client
+from .tracing import span, submit
+
+def split_band(pmin, pmax):
+    # Splits [pmin, pmax] into two disjoint inclusive bands at the geometric
+    # midpoint, since prices are spread over orders of magnitude. Returns None
+    # once the band cannot be narrowed any further.
+    mid = int(math.sqrt(max(pmin, 1) * pmax))
+    if mid <= pmin or mid >= pmax:
+        mid = (pmin + pmax) // 2
+    if mid <= pmin or mid >= pmax:
+        return None
+    return (pmin, mid), (mid + 1, pmax)
+
+def expand_splits(filters, splits):
+    # Cartesian product of the categorical splits, e.g.
+    # {'condition': [1, 2], 'shop_tier': [2, 3]} -> 4 SearchFilters
+    if not splits:
+        return [filters]
+    fields = list(splits)
+    return [
+        replace(filters, **dict(zip(fields, values)))
+        for values in itertools.product(*(splits[field] for field in fields))
+    ]
+
+def crawl_shard(keyword, shard, shard_depth, client, profile='full'):
+    # Paginates one shard up to shard_depth items. Returns (items, saturated):
+    # saturated means the shard holds more than was collected, i.e. the
+    # cursor ran out before the searchProductV5 totalData (the server caps
+    # how deep a query can be paged) or shard_depth was hit. Without a
+    # totalData only the shard_depth rule applies.
+    base_param = build_base_param(keyword, shard)
+    items = []
+    seen = set()
+    received = 0
+    total = None
+    next_param = None
+    while received < shard_depth:
+        page, cursor, page_total = search_page(client, keyword, base_param, next_param, profile)
+        if total is None:
+            total = page_total
+        if not page:
+            break
+        received += len(page)
+        for item in page:
+            if item.product_id not in seen:
+                seen.add(item.product_id)
+                items.append(item)
+        next_param = cursor
+        if not next_param:
+            break
+    if total is not None:
+        return items, received < total
+    return items, received >= shard_depth
+
+def sharded_search(keyword, filters=None, pmin=0, pmax=1_000_000_000, splits=None, shard_depth=300, min_band=1000, max_result=None, workers=8, debug=False, client=None, profile='full'):
+    # Crawls one query past the pagination depth limit by partitioning it
+    # into disjoint SearchFilters shards and crawling them concurrently.
+    #
+    # Every categorical split (see expand_splits) starts as one price band
+    # [pmin, pmax]. A shard whose pagination ends before the totalData it
+    # reported, or that still has results after shard_depth items, is
+    # considered saturated and is split into two narrower price bands, down
+    # to bands min_band IDR wide. Items of saturated shards are kept;
+    # everything is merged with a global product_id dedupe, in the order the
+    # shards finish. max_result caps the merged total.
+    from . import SearchFilters
+
+    client = client or get_default_client()
+    base = filters or SearchFilters()
+    results = SearchResults()
+    seen = set()
+    queue = deque(
+        replace(shard, pmin=pmin, pmax=pmax)
+        for shard in expand_splits(base, splits)
+    )
+
+    def crawl(shard):
+        with span('search.shard', keyword=keyword, pmin=shard.pmin, pmax=shard.pmax,
+                  condition=shard.condition, shop_tier=shard.shop_tier) as shard_span:
+            items, saturated = crawl_shard(keyword, shard, shard_depth, client, profile)
+            shard_span.set_attributes(items=len(items), saturated=saturated)
+            return items, saturated
+
+    def full():
+        return max_result is not None and len(results) >= max_result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        while (queue or running) and not full():
+            while queue and len(running) < workers:
+                shard = queue.popleft()
+                running[submit(executor, crawl, shard)] = shard
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard = running.pop(future)
+                try:
+                    items, saturated = future.result()
+                except Exception:
+                    print(traceback.format_exc())
+                    continue
+
+                new = 0
+                for item in items:
+                    if item.product_id in seen or full():
+                        continue
+                    seen.add(item.product_id)
+                    results.append(item)
+                    new += 1
+                if debug:
+                    logger.search(f'[{keyword}] shard pmin={shard.pmin} pmax={shard.pmax} '
+                                  f'condition={shard.condition} shop_tier={shard.shop_tier}: {len(items)} items, {new} new')
+
+                if saturated and shard.pmax - shard.pmin >= min_band:
+                    bands = split_band(shard.pmin, shard.pmax)
+                    if bands:
+                        queue.extend(replace(shard, pmin=lo, pmax=hi) for lo, hi in bands)
+
+        for future in running:
+            future.cancel()
+
+    return results
@@ -0,0 +1,44 @@
+import gzip
+import threading
+from .fast_json import dumps
+
+class JsonlSink:
+    # Writes one compact JSON object per line as soon as it is handed over, so
+    # memory stays bounded and the file is usable while a crawl is running.
+    # Paths ending in .gz (or compress=True) are gzip-compressed.
+    def __init__(self, path, compress=None, append=False):
+        self.path = str(path)
+        self.compress = self.path.endswith('.gz') if compress is None else compress
+        mode = 'ab' if append else 'wb'
+        self.file = gzip.open(self.path, mode) if self.compress else open(self.path, mode)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def write(self, item):
+        data = item.json() if hasattr(item, 'json') else item
+        line = dumps(data) + b'\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.count += 1
+
+    def close(self):
+        self.file.close()
+
+    def __call__(self, item):
+        self.write(item)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __repr__(self):
+        return f"<JsonlSink path={self.path!r} written={self.count}>"
+
+def results_to_jsonl(iterable, path, compress=None, append=False):
+    with JsonlSink(path, compress=compress, append=append) as sink:
+        for item in iterable:
+            sink.write(item)
+    return sink.count
@@ -1,19 +1,43 @@
-from dataclasses import dataclass, field, asdict
-from typing import List, Optional, Iterator
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Iterator
 
-@dataclass
+# Result types are slotted (no per-instance __dict__) and serialize through
+# hand-written to_dict/to_tuple methods instead of dataclasses.asdict, which
+# deep-copies recursively. Lists of plain values are shared, not copied.
+
+@dataclass(slots=True)
 class ProductMedia:
     original: str
     thumbnail: str
     max_res: str
 
-@dataclass
+    def to_dict(self) -> dict:
+        return {'original': self.original, 'thumbnail': self.thumbnail, 'max_res': self.max_res}
+
+    def to_tuple(self) -> tuple:
+        return (self.original, self.thumbnail, self.max_res)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProductMedia":
+        return cls(data['original'], data['thumbnail'], data['max_res'])
+
+@dataclass(slots=True)
 class ProductOption:
     option_id: int
     option_name: str
     option_child: List[str]
 
-@dataclass
+    def to_dict(self) -> dict:
+        return {'option_id': self.option_id, 'option_name': self.option_name, 'option_child': self.option_child}
+
+    def to_tuple(self) -> tuple:
+        return (self.option_id, self.option_name, self.option_child)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProductOption":
+        return cls(data['option_id'], data['option_name'], data['option_child'])
+
+@dataclass(slots=True)
 class ProductVariant:
     option_ids: List[int]
     option_name: str
@@ -24,7 +48,30 @@ class ProductVariant:
     image_url: Optional[str] = None
     stock: Optional[int] = None
 
-@dataclass
+    def to_dict(self) -> dict:
+        return {
+            'option_ids': self.option_ids,
+            'option_name': self.option_name,
+            'option_url': self.option_url,
+            'price': self.price,
+            'price_string': self.price_string,
+            'discount': self.discount,
+            'image_url': self.image_url,
+            'stock': self.stock,
+        }
+
+    def to_tuple(self) -> tuple:
+        return (self.option_ids, self.option_name, self.option_url, self.price,
+                self.price_string, self.discount, self.image_url, self.stock)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProductVariant":
+        return cls(
+            data['option_ids'], data['option_name'], data['option_url'], data['price'],
+            data['price_string'], data['discount'], data.get('image_url'), data.get('stock'),
+        )
+
+@dataclass(slots=True)
 class ProductData:
     product_id: int
     product_name: str
@@ -52,10 +99,82 @@ class ProductData:
     shop_name: str
     shop_location: List[str]
 
+    def to_dict(self) -> dict:
+        return {
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'url': self.url,
+            'product_status': self.product_status,
+            'product_price': self.product_price,
+            'product_price_text': self.product_price_text,
+            'product_price_original': self.product_price_original,
+            'product_discount_percentage': self.product_discount_percentage,
+            'weight': self.weight,
+            'weight_unit': self.weight_unit,
+            'product_media': [m.to_dict() for m in self.product_media],
+            'sold_count': self.sold_count,
+            'rating': self.rating,
+            'review_count': self.review_count,
+            'discussion_count': self.discussion_count,
+            'total_stock': self.total_stock,
+            'etalase': self.etalase,
+            'etalase_url': self.etalase_url,
+            'category': self.category,
+            'sub_category': self.sub_category,
+            'product_option': [o.to_dict() for o in self.product_option],
+            'variants': [v.to_dict() for v in self.variants],
+            'shop_id': self.shop_id,
+            'shop_name': self.shop_name,
+            'shop_location': self.shop_location,
+        }
+
+    def to_tuple(self) -> tuple:
+        return (
+            self.product_id, self.product_name, self.url, self.product_status,
+            self.product_price, self.product_price_text, self.product_price_original,
+            self.product_discount_percentage, self.weight, self.weight_unit,
+            tuple(m.to_tuple() for m in self.product_media),
+            self.sold_count, self.rating, self.review_count, self.discussion_count,
+            self.total_stock, self.etalase, self.etalase_url, self.category, self.sub_category,
+            tuple(o.to_tuple() for o in self.product_option),
+            tuple(v.to_tuple() for v in self.variants),
+            self.shop_id, self.shop_name, self.shop_location,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProductData":
+        return cls(
+            product_id=data['product_id'],
+            product_name=data['product_name'],
+            url=data['url'],
+            product_status=data['product_status'],
+            product_price=data['product_price'],
+            product_price_text=data['product_price_text'],
+            product_price_original=data['product_price_original'],
+            product_discount_percentage=data['product_discount_percentage'],
+            weight=data['weight'],
+            weight_unit=data['weight_unit'],
+            product_media=[ProductMedia.from_dict(m) for m in data['product_media']],
+            sold_count=data['sold_count'],
+            rating=data['rating'],
+            review_count=data['review_count'],
+            discussion_count=data['discussion_count'],
+            total_stock=data['total_stock'],
+            etalase=data['etalase'],
+            etalase_url=data['etalase_url'],
+            category=data['category'],
+            sub_category=data['sub_category'],
+            product_option=[ProductOption.from_dict(o) for o in data['product_option']],
+            variants=[ProductVariant.from_dict(v) for v in data['variants']],
+            shop_id=data['shop_id'],
+            shop_name=data['shop_name'],
+            shop_location=data['shop_location'],
+        )
+
     def json(self):
-        return asdict(self)
+        return self.to_dict()
 
-@dataclass
+@dataclass(slots=True)
 class ProductReview:
     feedback_id: int
     variant_name: Optional[str]
@@ -70,10 +189,102 @@ class ProductReview:
     videos: List[str] = field(default_factory=list)
     likes: int = 0
 
+    def to_dict(self) -> dict:
+        return {
+            'feedback_id': self.feedback_id,
+            'variant_name': self.variant_name,
+            'message': self.message,
+            'rating': self.rating,
+            'review_age': self.review_age,
+            'user_full_name': self.user_full_name,
+            'user_url': self.user_url,
+            'response_message': self.response_message,
+            'response_created_text': self.response_created_text,
+            'images': self.images,
+            'videos': self.videos,
+            'likes': self.likes,
+        }
+
+    def to_tuple(self) -> tuple:
+        return (
+            self.feedback_id, self.variant_name, self.message, self.rating, self.review_age,
+            self.user_full_name, self.user_url, self.response_message,
+            self.response_created_text, self.images, self.videos, self.likes,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProductReview":
+        return cls(
+            feedback_id=data['feedback_id'],
+            variant_name=data.get('variant_name'),
+            message=data['message'],
+            rating=data['rating'],
+            review_age=data['review_age'],
+            user_full_name=data['user_full_name'],
+            user_url=data['user_url'],
+            response_message=data.get('response_message'),
+            response_created_text=data.get('response_created_text'),
+            images=data.get('images', []),
+            videos=data.get('videos', []),
+            likes=data.get('likes', 0),
+        )
+
     def json(self):
-        return asdict(self)
+        return self.to_dict()
+
+@dataclass(slots=True)
+class ProductOutcome:
+    product_ref: str
+    status: str
+    product: Optional[ProductData] = None
+    error: Optional[str] = None
+    attempts: int = 1
 
-@dataclass
+    @property
+    def ok(self) -> bool:
+        return self.status == 'ok'
+
+    def to_dict(self) -> dict:
+        return {
+            'product_ref': self.product_ref,
+            'status': self.status,
+            'product': self.product.to_dict() if self.product is not None else None,
+            'error': self.error,
+            'attempts': self.attempts,
+        }
+
+    def json(self):
+        return self.to_dict()
+
+@dataclass(slots=True)
+class ProductChange:
+    product_id: str
+    timestamp: float
+    # field -> [old, new]; variant fields are named variant.<option ids>.<field>
+    changes: Dict[str, list]
+    first_seen: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            'product_id': self.product_id,
+            'timestamp': self.timestamp,
+            'changes': self.changes,
+            'first_seen': self.first_seen,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProductChange":
+        return cls(
+            product_id=data['product_id'],
+            timestamp=data['timestamp'],
+            changes=data['changes'],
+            first_seen=data.get('first_seen', False),
+        )
+
+    def json(self):
+        return self.to_dict()
+
+@dataclass(slots=True)
 class TokopaediShop:
     shop_id: int
     name: str
@@ -81,7 +292,23 @@ class TokopaediShop:
     url: str
     is_official: Optional[bool]
 
-@dataclass
+    def to_dict(self) -> dict:
+        return {
+            'shop_id': self.shop_id,
+            'name': self.name,
+            'city': self.city,
+            'url': self.url,
+            'is_official': self.is_official,
+        }
+
+    def to_tuple(self) -> tuple:
+        return (self.shop_id, self.name, self.city, self.url, self.is_official)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TokopaediShop":
+        return cls(data['shop_id'], data['name'], data.get('city'), data['url'], data.get('is_official'))
+
+@dataclass(slots=True)
 class ProductSearchResult:
     product_id: int
     product_sku:int
@@ -98,12 +325,62 @@ class ProductSearchResult:
     product_detail: Optional[ProductData] = None
     product_reviews: Optional[List[ProductReview]] = None
 
+    def to_dict(self) -> dict:
+        return {
+            'product_id': self.product_id,
+            'product_sku': self.product_sku,
+            'name': self.name,
+            'category': self.category,
+            'url': self.url,
+            'sold_count': self.sold_count,
+            'original_price': self.original_price,
+            'real_price': self.real_price,
+            'real_price_text': self.real_price_text,
+            'rating': self.rating,
+            'image': self.image,
+            'shop': self.shop.to_dict(),
+            'product_detail': self.product_detail.to_dict() if self.product_detail is not None else None,
+            'product_reviews': [r.to_dict() for r in self.product_reviews] if self.product_reviews is not None else None,
+        }
+
+    def to_tuple(self) -> tuple:
+        return (
+            self.product_id, self.product_sku, self.name, self.category, self.url,
+            self.sold_count, self.original_price, self.real_price, self.real_price_text,
+            self.rating, self.image, self.shop.to_tuple(),
+            self.product_detail.to_tuple() if self.product_detail is not None else None,
+            tuple(r.to_tuple() for r in self.product_reviews) if self.product_reviews is not None else None,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ProductSearchResult":
+        detail = data.get('product_detail')
+        reviews = data.get('product_reviews')
+        return cls(
+            product_id=data['product_id'],
+            product_sku=data['product_sku'],
+            name=data['name'],
+            category=data['category'],
+            url=data['url'],
+            sold_count=data.get('sold_count'),
+            original_price=data['original_price'],
+            real_price=data['real_price'],
+            real_price_text=data['real_price_text'],
+            rating=data.get('rating'),
+            image=data.get('image'),
+            shop=TokopaediShop.from_dict(data['shop']),
+            product_detail=ProductData.from_dict(detail) if detail is not None else None,
+            product_reviews=[ProductReview.from_dict(r) for r in reviews] if reviews is not None else None,
+        )
+
     def json(self):
-        return asdict(self)
+        return self.to_dict()
 
 class SearchResults:
-    def __init__(self, items: List[ProductSearchResult] = None):
+    def __init__(self, items: List[ProductSearchResult] = None, keyword_matches: Dict[int, List[str]] = None):
         self.items = items or []
+        # product_id -> keywords that returned it, filled in by search_many
+        self.keyword_matches = keyword_matches or {}
 
     def append(self, item: ProductSearchResult) -> None:
         self.items.append(item)
@@ -123,6 +400,10 @@ class SearchResults:
     def json(self) -> List[dict]:
         return [item.json() for item in self.items]
 
+    @classmethod
+    def from_json(cls, data: List[dict]) -> "SearchResults":
+        return cls([ProductSearchResult.from_dict(item) for item in data])
+
     def __repr__(self) -> str:
         return f"<SearchResults total={len(self.items)}>"
 
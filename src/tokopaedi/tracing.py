@@ -0,0 +1,188 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Optional tracing. A crawl wrapped in `with tracer.crawl("nightly"):` becomes
+# a root span; every client request made inside it (search page, product,
+# reviews page) is recorded as a child span with its product_id / page,
+# response bytes, status, attempts and cache hit. enrich adds one span per
+# product, so a slow product holding up the tail shows up as one long branch.
+# Outside a crawl span nothing is recorded and the helpers are no-ops.
+#
+# The current span lives in a ContextVar: asyncio tasks inherit it on their
+# own, thread pools get it through submit() below.
+
+_current = contextvars.ContextVar('tokopaedi_span', default=None)
+
+def new_id(nbytes):
+    return os.urandom(nbytes).hex()
+
+class Span:
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+                 'attributes', 'status', 'error', 'thread')
+
+    def __init__(self, tracer, name, trace_id, parent_id, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = new_id(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.status = 'ok'
+        self.error = None
+        self.thread = threading.current_thread().name
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_dict(self):
+        # field names follow the OTLP JSON span layout
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'start_time_unix_nano': self.start_ns,
+            'end_time_unix_nano': self.end_ns,
+            'attributes': self.attributes,
+            'status': self.status,
+            'error': self.error,
+            'thread': self.thread,
+        }
+
+    def __repr__(self):
+        return f"<Span {self.name} {self.duration * 1000:.1f}ms {self.attributes}>"
+
+class NullSpan:
+    # Stand-in handed out when no crawl span is active
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+NULL_SPAN = NullSpan()
+
+class InMemoryExporter:
+    def __init__(self):
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def on_start(self, span):
+        pass
+
+    def on_end(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+class JsonFileExporter:
+    # One JSON object per finished span (JSON Lines)
+    def __init__(self, path='tokopaedi_trace.jsonl'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def on_start(self, span):
+        pass
+
+    def on_end(self, span):
+        line = json.dumps(span.to_dict(), separators=(',', ':'), default=str)
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class OpenTelemetryBridge:
+    # Mirrors spans into an OpenTelemetry tracer as they start and end, so an
+    # OTel SDK pipeline (OTLP, Jaeger, ...) exports them like any other spans.
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+        self.trace = trace
+        self.tracer = tracer or trace.get_tracer('tokopaedi')
+        self.live = {}
+        self.lock = threading.Lock()
+
+    def on_start(self, span):
+        with self.lock:
+            parent = self.live.get(span.parent_id)
+        context = self.trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = self.tracer.start_span(span.name, context=context, start_time=span.start_ns)
+        with self.lock:
+            self.live[span.span_id] = otel_span
+
+    def on_end(self, span):
+        with self.lock:
+            otel_span = self.live.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            if value is not None:
+                otel_span.set_attribute(key, value if isinstance(value, (bool, int, float, str)) else str(value))
+        if span.status == 'error':
+            otel_span.set_status(self.trace.Status(self.trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=span.end_ns)
+
+def default_exporter(path='tokopaedi_trace.jsonl'):
+    # An OpenTelemetry SDK with a configured tracer provider wins; otherwise
+    # spans go to a JSON Lines file
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return JsonFileExporter(path)
+    if type(trace.get_tracer_provider()).__name__ == 'ProxyTracerProvider':
+        return JsonFileExporter(path)
+    return OpenTelemetryBridge()
+
+class Tracer:
+    def __init__(self, exporter=None, path='tokopaedi_trace.jsonl'):
+        self.exporter = exporter if exporter is not None else default_exporter(path)
+
+    @contextmanager
+    def start_span(self, name, parent=None, **attributes):
+        span = Span(self, name, parent.trace_id if parent else new_id(16), parent.span_id if parent else None, attributes)
+        self.exporter.on_start(span)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = 'error'
+            span.error = repr(e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end_ns = time.time_ns()
+            self.exporter.on_end(span)
+
+    def crawl(self, name='crawl', **attributes):
+        # Root span of a crawl run; a new trace every time
+        return self.start_span(name, None, **attributes)
+
+def current_span():
+    return _current.get() or NULL_SPAN
+
+@contextmanager
+def span(name, **attributes):
+    parent = _current.get()
+    if parent is None:
+        yield NULL_SPAN
+        return
+    with parent.tracer.start_span(name, parent, **attributes) as child:
+        yield child
+
+def submit(executor, fn, *args, **kwargs):
+    # executor.submit that carries the caller's current span into the worker
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
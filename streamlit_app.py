@@ -14,7 +14,7 @@ import re
 from collections import Counter
 
 # Import tokopaedi library
-from tokopaedi import search, SearchFilters, get_product, get_reviews, combine_data
+from tokopaedi import search, SearchFilters, enrich, TokopaediClient, ResponseCache
 
 # Page configuration
 st.set_page_config(
@@ -57,6 +57,11 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Helper functions
+@st.cache_resource
+def get_client():
+    """Shared HTTP client; repeated keywords are served from the on-disk cache"""
+    return TokopaediClient(cache=ResponseCache("tokopaedi_cache.sqlite"))
+
 @st.cache_data
 def preprocess_data(data):
     """Preprocess the scraped data"""
@@ -201,7 +206,7 @@ def scrape_and_analyze(keyword, max_results, filters, include_details, include_r
     try:
         # Step 1: Search products
         status_text.text("🔍 Mencari produk...")
-        results = search(keyword, max_result=max_results, filters=filters, debug=False)
+        results = search(keyword, max_result=max_results, filters=filters, debug=False, client=get_client())
         progress_bar.progress(30)
         
         if not results:
@@ -211,28 +216,24 @@ def scrape_and_analyze(keyword, max_results, filters, include_details, include_r
         # Step 2: Get additional data if requested
         if include_details or include_reviews:
             status_text.text("📊 Mengambil data detail dan review...")
-            for i, result in enumerate(results):
-                product_data = None
-                review_data = None
-                
-                if include_details:
-                    try:
-                        product_data = get_product(product_id=result.product_id, debug=False)
-                    except Exception as e:
-                        st.warning(f"Gagal mengambil detail produk {result.product_id}: {str(e)}")
-                
-                if include_reviews:
-                    try:
-                        review_data = get_reviews(product_id=result.product_id, max_result=max_reviews, debug=False)
-                    except Exception as e:
-                        st.warning(f"Gagal mengambil review produk {result.product_id}: {str(e)}")
-                
-                if product_data or review_data:
-                    combine_data(result, product_data, review_data)
-                
-                # Update progress
-                progress = 30 + (i + 1) / len(results) * 50
+            def update_progress(done, total, result):
+                progress = 30 + done / total * 50
                 progress_bar.progress(int(progress))
+
+            enrich(
+                results,
+                details=include_details,
+                reviews=max_reviews if include_reviews else 0,
+                workers=8,
+                progress=update_progress,
+                client=get_client(),
+            )
+
+            for result in results:
+                if include_details and result.product_detail is None:
+                    st.warning(f"Gagal mengambil detail produk {result.product_id}")
+                if include_reviews and result.product_reviews is None:
+                    st.warning(f"Gagal mengambil review produk {result.product_id}")
         
         # Step 3: Process data
         status_text.text("🔄 Memproses data...")
@@ -1,5 +1,972 @@
+import json
+
 from tokopaedi import __version__
 
 
 def test_version():
     assert __version__ == '0.1.0'
+
+
+def test_default_client_is_shared():
+    from tokopaedi import TokopaediClient, get_default_client, set_default_client
+
+    assert get_default_client() is get_default_client()
+    client = TokopaediClient(pool_size=4)
+    set_default_client(client)
+    try:
+        assert get_default_client() is client
+    finally:
+        set_default_client(None)
+        client.close()
+
+
+def make_search_result(product_id):
+    from tokopaedi.tokopaedi_types import ProductSearchResult, TokopaediShop
+
+    return ProductSearchResult(
+        product_id=product_id,
+        product_sku=product_id,
+        name=f"product {product_id}",
+        category="Mouse",
+        url=f"https://www.tokopedia.com/shop/product-{product_id}",
+        sold_count=1,
+        original_price="",
+        real_price=1000,
+        real_price_text="Rp1.000",
+        rating=5.0,
+        image=None,
+        shop=TokopaediShop(shop_id=1, name="shop", city="Jakarta", url="", is_official=False),
+    )
+
+
+def test_enrich_fills_results_in_place(monkeypatch):
+    import importlib
+    from tokopaedi.tokopaedi_types import SearchResults
+
+    enrich_module = importlib.import_module("tokopaedi.enrich")
+
+    monkeypatch.setattr(enrich_module, "get_product", lambda product_id, **kwargs: f"detail-{product_id}")
+    monkeypatch.setattr(enrich_module, "get_reviews", lambda product_id, max_result, **kwargs: [product_id] * max_result)
+
+    results = SearchResults([make_search_result(i) for i in range(20)])
+    calls = []
+    enrich_module.enrich(results, reviews=2, workers=4, progress=lambda done, total, item: calls.append((done, total)))
+
+    assert [r.product_id for r in results] == list(range(20))
+    assert all(r.product_detail == f"detail-{r.product_id}" for r in results)
+    assert all(r.product_reviews == [r.product_id] * 2 for r in results)
+    assert [done for done, _ in calls] == list(range(1, 21))
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode("utf-8")
+
+    def json(self):
+        return self.payload
+
+
+class FakeClient:
+    def __init__(self, responder):
+        self.responder = responder
+        self.requests = []
+
+    def post(self, path, headers, json_data, endpoint=None):
+        self.requests.append((path, json_data))
+        result = self.responder(path, json_data)
+        return result if isinstance(result, FakeResponse) else FakeResponse(result)
+
+
+def search_page(product_ids, cursor):
+    return {
+        "data": {
+            "searchProductV5": {
+                "header": {"additionalParams": cursor},
+                "data": {
+                    "products": [
+                        {
+                            "id": str(pid),
+                            "name": f"product {pid}",
+                            "url": f"https://www.tokopedia.com/shop/product-{pid}",
+                            "price": {"text": "Rp1.000", "number": 1000, "original": ""},
+                            "shop": {"id": "1", "name": "shop", "city": "Jakarta", "url": ""},
+                            "stock": {"sold": 1, "ttsSKUID": str(pid)},
+                            "category": {"name": "Mouse"},
+                            "mediaURL": {"image700": ""},
+                            "rating": "4.5",
+                            "badge": None,
+                        }
+                        for pid in product_ids
+                    ]
+                },
+            }
+        }
+    }
+
+
+def test_search_iter_paginates_and_dedupes():
+    from urllib.parse import parse_qs
+    from tokopaedi import search_iter
+
+    pages = {"1": ([1, 2, 3], "page=2"), "2": ([3, 4, 5], "page=3"), "3": ([6, 7, 8], "page=4")}
+
+    def responder(path, json_data):
+        page = parse_qs(json_data["variables"]["params"])["page"][0]
+        product_ids, cursor = pages[page]
+        return search_page(product_ids, cursor)
+
+    client = FakeClient(responder)
+    items = list(search_iter("mouse", max_result=6, client=client))
+
+    assert [item.product_id for item in items] == ["1", "2", "3", "4", "5"]
+    assert len(client.requests) == 2
+
+
+def reviews_page(feedback_ids, has_next):
+    return {
+        "data": {
+            "productrevGetProductReviewList": {
+                "list": [
+                    {"feedbackID": str(fid), "message": f"review {fid}", "productRating": 5}
+                    for fid in feedback_ids
+                ],
+                "hasNext": has_next,
+            }
+        }
+    }
+
+
+def test_get_reviews_fetches_pages_concurrently_in_order():
+    from tokopaedi import get_reviews
+
+    total = 35
+
+    def responder(path, json_data):
+        page = json_data["variables"]["page"]
+        limit = json_data["variables"]["limit"]
+        start = (page - 1) * limit
+        ids = list(range(start, min(start + limit, total)))
+        return reviews_page(ids, start + limit < total)
+
+    client = FakeClient(responder)
+    reviews = get_reviews(123, max_result=25, page_size=10, client=client)
+    assert [r.feedback_id for r in reviews] == list(range(25))
+    assert sorted(req[1]["variables"]["page"] for req in client.requests) == [1, 2, 3]
+
+    client = FakeClient(responder)
+    reviews = get_reviews(123, max_result=100, page_size=500, client=client)
+    assert [r.feedback_id for r in reviews] == list(range(total))
+    assert client.requests[0][1]["variables"]["limit"] == 50
+
+
+def pdp_payload(product_id, name="product", price=1000, stock="5", variants=()):
+    return {
+        "data": {
+            "pdpGetLayout": {
+                "basicInfo": {
+                    "productID": str(product_id),
+                    "url": f"https://www.tokopedia.com/shop/product-{product_id}",
+                    "status": "ACTIVE",
+                    "weight": 100,
+                    "weightUnit": "GRAM",
+                    "txStats": {"countSold": "7"},
+                    "stats": {"rating": 4.5, "countReview": "3", "countTalk": "1"},
+                    "totalStockFmt": stock,
+                    "menu": {"name": "Etalase", "url": ""},
+                    "category": {"name": "Mouse", "detail": [{"name": "Komputer"}, {"name": "Mouse"}]},
+                    "shopID": "1",
+                    "shopName": "shop",
+                    "shopMultilocation": {"cityName": "Jakarta"},
+                },
+                "components": [
+                    {"name": "product_content", "data": [{"name": name, "price": {"value": price, "priceFmt": f"Rp{price}"}}]},
+                    {"name": "product_media", "data": [{"media": [{"URLOriginal": "o", "URLThumbnail": "t", "URLMaxRes": "m"}]}]},
+                    {
+                        "name": "mini_variant_options",
+                        "data": [{
+                            "variants": [{"productVariantID": "9", "name": "Warna", "option": [{"value": "Hitam"}]}],
+                            "children": [
+                                {"optionID": [1], "productName": v, "productURL": f"u-{v}", "price": price, "stock": {"value": 2}}
+                                for v in variants
+                            ],
+                        }],
+                    },
+                ],
+            }
+        }
+    }
+
+
+def test_get_products_batches_operations():
+    from tokopaedi import get_products
+
+    def responder(path, json_data):
+        return [
+            pdp_payload(op["variables"]["productId"]) if op["variables"]["productId"] != "3" else {"errors": ["not found"]}
+            for op in json_data
+        ]
+
+    client = FakeClient(responder)
+    products = get_products([1, 2, 3, 4, 5], batch_size=2, client=client)
+
+    assert len(client.requests) == 3
+    assert [p.product_id if p else None for p in products] == ["1", "2", None, "4", "5"]
+
+
+def test_response_cache_keys_ttl_and_eviction(monkeypatch):
+    from tokopaedi import ResponseCache
+    from tokopaedi.cache import cache_key
+
+    a = cache_key("search", {"query": "q", "variables": {"params": "q=mouse&page=1", "query": "mouse"}})
+    b = cache_key("search", {"query": "q", "variables": {"params": "page=1&q=mouse", "query": "mouse"}})
+    assert a == b
+
+    cache = ResponseCache(":memory:", ttl={"product": 60}, max_entries=2)
+    clock = [1000.0]
+    monkeypatch.setattr("tokopaedi.cache.time.time", lambda: clock[0])
+
+    cache.set("k1", "product", b'{"a": 1}')
+    clock[0] += 1
+    cache.set("k2", "product", b'{"a": 2}')
+    clock[0] += 1
+    assert cache.get("k1", "product").json() == {"a": 1}
+    clock[0] += 1
+    cache.set("k3", "product", b'{"a": 3}')
+    assert cache.get("k2", "product") is None
+    clock[0] += 120
+    assert cache.get("k1", "product") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 1}
+
+
+def test_client_serves_repeated_requests_from_cache():
+    from tokopaedi import TokopaediClient, ResponseCache
+    from tokopaedi.cache import cacheable
+    from tokopaedi.metrics import timed_decode
+
+    body = {"data": {"pdpGetLayout": {"basicInfo": {}}, "ads": None}}
+
+    class FakeSession:
+        calls = 0
+
+        def post(self, url, headers, json):
+            FakeSession.calls += 1
+            return FakeResponse(body)
+
+    client = TokopaediClient(cache=ResponseCache(":memory:"))
+    client.session = FakeSession()
+    payload = {"query": "q", "variables": {"productId": "1"}}
+    # stored once the fetcher decodes it, not by post() itself
+    timed_decode(client, "product", client.post("/graphql/ProductDetails/getPDPLayout", {}, payload, endpoint="product"))
+    response = client.post("/graphql/ProductDetails/getPDPLayout", {}, payload, endpoint="product")
+
+    assert FakeSession.calls == 1
+    assert response.json() == body
+
+    # only the endpoint's main root field decides; other roots may be null
+    assert cacheable("search", {"data": {"searchProductV5": {}, "displayAdsV3": None}})
+    assert not cacheable("search", {"data": {"searchProductV5": None}, "errors": ["x"]})
+    assert not cacheable("product", [{"data": {"pdpGetLayout": {}}}, {"data": {"pdpGetLayout": None}}])
+
+
+def test_client_retries_throttled_requests():
+    from tokopaedi import TokopaediClient, RateLimiter, RetryPolicy
+
+    statuses = [429, 503, 200]
+
+    class FakeSession:
+        def post(self, url, headers, json):
+            return FakeResponse({"data": {}}, status_code=statuses.pop(0))
+
+    limiter = RateLimiter(rate=1000, window=2, error_threshold=0.4, min_rate=1)
+    client = TokopaediClient(rate_limiter=limiter, retry=RetryPolicy(max_retries=3, backoff=0))
+    client.session = FakeSession()
+
+    response = client.post("/graphql/SearchResult/getProductResult", {}, {}, endpoint="search")
+    assert response.status_code == 200
+    assert statuses == []
+    assert limiter.current_rate("search") == 500
+
+
+def test_rate_limiter_recovers_after_clean_window():
+    from tokopaedi import RateLimiter
+
+    limiter = RateLimiter(rate=4, window=2, error_threshold=0.4, increase=1, min_rate=1)
+    for _ in range(2):
+        limiter.record("reviews", False)
+    assert limiter.current_rate("reviews") == 2
+    for _ in range(2):
+        limiter.record("reviews", True)
+    assert limiter.current_rate("reviews") == 3
+    assert limiter.current_rate("product") == 4
+
+
+def test_get_product_batch_reports_outcomes_and_retries():
+    from tokopaedi import get_product_batch
+
+    throttled_once = set()
+
+    def responder(path, json_data):
+        product_id = json_data["variables"]["productId"]
+        if product_id == "2" and product_id not in throttled_once:
+            throttled_once.add(product_id)
+            return FakeResponse({}, status_code=429)
+        if product_id == "3":
+            return {"data": {"pdpGetLayout": None}, "errors": ["not found"]}
+        if product_id == "4":
+            return {"data": {"pdpGetLayout": {"basicInfo": {"weight": "heavy"}}}}
+        if product_id == "5":
+            return FakeResponse({}, status_code=503)
+        return pdp_payload(product_id)
+
+    settled = []
+    outcomes = get_product_batch(
+        [1, 2, 3, 4, 5], workers=3, retry_rounds=1, retry_delay=0,
+        client=FakeClient(responder), on_outcome=settled.append,
+    )
+
+    assert [o.status for o in outcomes] == ["ok", "ok", "not_found", "parse_error", "server_error"]
+    assert outcomes[4].error == "HTTP 503"
+    assert outcomes[1].attempts == 2 and outcomes[1].product.product_id == "2"
+    assert outcomes[4].attempts == 2
+    assert len(settled) == 5
+
+
+def test_crawl_journal_resumes_search_and_enrich(tmp_path, monkeypatch):
+    import importlib
+    from urllib.parse import parse_qs
+    from tokopaedi import search_iter, CrawlJournal
+    from tokopaedi.checkpoint import search_key
+    from tokopaedi.search import build_base_param
+
+    pages = {"1": ([1, 2, 3], "page=2"), "2": ([3, 4, 5], "page=3"), "3": ([6, 7], "page=4"), "4": ([], "")}
+
+    def responder(path, json_data):
+        page = parse_qs(json_data["variables"]["params"])["page"][0]
+        return search_page(*pages[page])
+
+    path = tmp_path / "journal.jsonl"
+    with CrawlJournal(str(path)) as journal:
+        crawl = search_iter("mouse", max_result=100, client=FakeClient(responder), journal=journal)
+        first_run = [next(crawl).product_id for _ in range(4)]
+        crawl.close()
+    assert first_run == ["1", "2", "3", "4"]
+
+    client = FakeClient(responder)
+    with CrawlJournal(str(path)) as journal:
+        resumed = [item.product_id for item in search_iter("mouse", max_result=100, client=client, journal=journal)]
+        assert journal.is_search_done(search_key("mouse", build_base_param("mouse")))
+    assert resumed == ["4", "5", "6", "7"]
+    assert parse_qs(client.requests[0][1]["variables"]["params"])["page"][0] == "2"
+
+    enrich_module = importlib.import_module("tokopaedi.enrich")
+    fetched = []
+    monkeypatch.setattr(enrich_module, "get_product", lambda product_id, **kwargs: fetched.append(product_id) or "detail")
+    results = [make_search_result(i) for i in range(3)]
+    with CrawlJournal(str(path)) as journal:
+        journal.record_enriched(1)
+        enrich_module.enrich(results, reviews=0, journal=journal)
+    with CrawlJournal(str(path)) as journal:
+        assert all(journal.is_enriched(i) for i in range(3))
+    assert sorted(fetched) == [0, 2]
+
+
+def test_crawl_journal_keeps_searches_with_other_filters_apart(tmp_path):
+    from urllib.parse import parse_qs
+    from tokopaedi import search_iter, CrawlJournal, SearchFilters
+
+    def responder(path, json_data):
+        params = parse_qs(json_data["variables"]["params"])
+        offset = 10 * int(params["condition"][0])
+        return search_page([offset + 1, offset + 2], "")
+
+    path = str(tmp_path / "journal.jsonl")
+    with CrawlJournal(path) as journal:
+        new = [item.product_id for item in search_iter("mouse", filters=SearchFilters(condition=1), client=FakeClient(responder), journal=journal)]
+    with CrawlJournal(path) as journal:
+        used = [item.product_id for item in search_iter("mouse", filters=SearchFilters(condition=2), client=FakeClient(responder), journal=journal)]
+        again = list(search_iter("mouse", filters=SearchFilters(condition=1), client=FakeClient(responder), journal=journal))
+
+    assert new == ["11", "12"]
+    assert used == ["21", "22"]
+    assert again == []
+
+
+def test_results_to_jsonl_writes_compact_lines(tmp_path):
+    import gzip
+    from tokopaedi import results_to_jsonl
+
+    items = [make_search_result(i) for i in range(3)]
+    assert results_to_jsonl(items, tmp_path / "out.jsonl") == 3
+    assert results_to_jsonl(items, tmp_path / "out.jsonl.gz") == 3
+
+    plain = (tmp_path / "out.jsonl").read_bytes().splitlines()
+    with gzip.open(tmp_path / "out.jsonl.gz") as f:
+        compressed = f.read().splitlines()
+    assert plain == compressed
+    assert [json.loads(line)["product_id"] for line in plain] == [0, 1, 2]
+    assert b", " not in plain[0]
+
+
+def test_to_parquet_normalizes_output_json(tmp_path):
+    import pytest
+
+    pq = pytest.importorskip("pyarrow.parquet")
+    from pathlib import Path
+    from tokopaedi import to_parquet
+
+    data = json.loads((Path(__file__).parent.parent / "output.json").read_text())
+    paths = to_parquet(data, tmp_path)
+
+    products = pq.read_table(paths["products"])
+    reviews = pq.read_table(paths["reviews"])
+    assert products.num_rows == len(data)
+    assert reviews.num_rows == sum(len(item["product_reviews"] or []) for item in data)
+    assert products.schema.field("real_price").type == "int64"
+    assert set(reviews.column("product_id").to_pylist()) <= set(products.column("product_id").to_pylist())
+    assert pq.read_table(paths["shops"]).num_rows == len({item["shop"]["shop_id"] for item in data})
+
+
+def test_result_types_round_trip_without_asdict():
+    from dataclasses import asdict
+    from pathlib import Path
+    from tokopaedi import SearchResults
+
+    data = json.loads((Path(__file__).parent.parent / "output.json").read_text())
+    results = SearchResults.from_json(data)
+
+    assert results.json() == data
+    assert [asdict(item) for item in results] == data
+    assert not hasattr(results[0], "__dict__")
+    assert results[0].to_tuple()[0] == data[0]["product_id"]
+
+
+def test_lazy_product_data_builds_nested_fields_on_access():
+    from tokopaedi.get_product import product_details_extractor
+    from tokopaedi import LazyProductData, ProductData
+
+    payload = pdp_payload(42, price=2500, variants=["Hitam", "Putih"])
+    eager = product_details_extractor(payload)
+    lazy = product_details_extractor(payload, lazy=True)
+
+    assert isinstance(lazy, LazyProductData) and isinstance(lazy, ProductData)
+    assert lazy.product_price == 2500 and lazy.total_stock == 5
+    assert lazy._variants is None and lazy._product_media is None
+    assert lazy.variants is lazy.variants
+    assert [v.option_name for v in lazy.variants] == ["Hitam", "Putih"]
+    assert lazy.to_dict() == eager.to_dict()
+
+
+def test_lazy_product_data_equals_eager_and_supports_replace():
+    from dataclasses import replace
+    from tokopaedi.get_product import product_details_extractor
+    from tokopaedi import LazyProductData
+
+    payload = pdp_payload(42, price=2500, variants=["Hitam", "Putih"])
+    eager = product_details_extractor(payload)
+    lazy = product_details_extractor(payload, lazy=True)
+
+    assert lazy == eager and eager == lazy
+    assert lazy != replace(eager, product_price=1)
+
+    cheaper = replace(lazy, product_price=5)
+    assert isinstance(cheaper, LazyProductData) and cheaper.product_price == 5
+    assert cheaper == replace(eager, product_price=5)
+    assert [v.option_name for v in cheaper.variants] == ["Hitam", "Putih"]
+    assert lazy.product_price == 2500
+
+
+def test_product_extractor_handles_archived_payloads_in_bulk():
+    from tokopaedi import ProductExtractor
+    from tokopaedi.get_product import index_components
+
+    payloads = [pdp_payload(i, variants=["a"]) for i in range(3)]
+    archived = [json.dumps(p).encode("utf-8") for p in payloads]
+    products = list(ProductExtractor().extract_many(archived))
+    assert [p.product_id for p in products] == ["0", "1", "2"]
+    assert products[0].variants[0].option_name == "a"
+
+    layout = [{"name": "product_content", "data": [1]}, {"name": "product_content", "data": [2]}]
+    assert index_components(layout) == {"product_content": [1]}
+
+
+def test_query_profiles_trim_selection_and_extractors_tolerate_gaps():
+    from tokopaedi.query_profiles import product_query, reviews_query, search_query
+    from tokopaedi.get_product import PDP_QUERY, product_details_extractor, product_payload
+    from tokopaedi.search import SEARCH_QUERY, search_payload, search_extractor
+
+    assert product_query('full') == PDP_QUERY
+    assert search_query('full') == SEARCH_QUERY
+    for query in (product_query('minimal'), product_query('pricing'), search_query('minimal'), reviews_query('minimal')):
+        assert query.count('{') == query.count('}')
+    assert len(product_query('minimal')) < len(product_query('pricing')) < len(PDP_QUERY)
+    assert 'pdpDataProductMedia' not in product_query('pricing')
+    assert 'global_search_navigation' not in search_query('minimal')
+    assert 'header {\ntotalData\nadditionalParams\n}' in search_query('minimal')
+    assert 'query' not in search_payload('mouse', 'q=mouse', profile='minimal')['variables']
+    assert product_payload(product_id=1, profile='pricing')['query'] == product_query('pricing')
+
+    payload = pdp_payload(5, variants=("a",))
+    layout = payload["data"]["pdpGetLayout"]
+    layout["components"] = [c for c in layout["components"] if c["name"] != "product_media"]
+    layout["basicInfo"]["stats"] = None
+    layout["basicInfo"]["totalStockFmt"] = None
+    layout["components"][1]["data"][0]["children"][0]["stock"] = {"stock": 4}
+    product = product_details_extractor(payload)
+    assert product.product_media == [] and product.rating == 0.0 and product.total_stock == 0
+    assert product.variants[0].stock == 4
+
+    result = search_extractor({"products": [{"id": "1", "name": "x", "shop": None, "price": None}]})
+    assert result[0].shop.shop_id is None and result[0].real_price is None
+
+    import pytest
+    with pytest.raises(ValueError):
+        product_query('tiny')
+
+
+def test_search_many_interleaves_keywords_and_dedupes_globally():
+    from urllib.parse import parse_qs
+    from tokopaedi import search_many
+
+    pages = {
+        ("mouse", "1"): ([1, 2], "page=2"),
+        ("mouse", "2"): ([3], "page=3"),
+        ("mouse", "3"): ([4], "page=4"),
+        ("keyboard", "1"): ([2, 9], ""),
+    }
+
+    def responder(path, json_data):
+        params = parse_qs(json_data["variables"]["params"])
+        product_ids, cursor = pages[(params["q"][0], params["page"][0])]
+        return search_page(product_ids, cursor)
+
+    client = FakeClient(responder)
+    results = search_many(["mouse", "keyboard", "mouse"], max_result_per_keyword=3, workers=1, client=client)
+
+    assert [item.product_id for item in results] == ["1", "2", "9", "3"]
+    assert results.keyword_matches["2"] == ["mouse", "keyboard"]
+    assert results.keyword_matches["9"] == ["keyboard"]
+    # one worker: mouse p1, keyboard p1, mouse p2, then mouse hit its cap
+    assert len(client.requests) == 3
+
+
+def test_sharded_search_splits_saturated_price_bands():
+    from urllib.parse import parse_qs
+    from tokopaedi import sharded_search, SearchFilters
+    from tokopaedi.sharding import split_band
+
+    assert split_band(0, 10000) == ((0, 100), (101, 10000))
+    assert split_band(5, 6) is None
+
+    prices = {pid: pid * 100 for pid in range(1, 11)}
+
+    def responder(path, json_data):
+        params = {k: v[0] for k, v in parse_qs(json_data["variables"]["params"]).items()}
+        lo, hi, page = int(params["pmin"]), int(params["pmax"]), int(params["page"])
+        assert params["condition"] == "1"
+        matching = [pid for pid, price in prices.items() if lo <= price <= hi]
+        # the server only ever shows the first two pages of a query
+        chunk = matching[(page - 1) * 2:page * 2] if page <= 2 else []
+        return search_page(chunk, f"page={page + 1}")
+
+    results = sharded_search(
+        "mouse", filters=SearchFilters(condition=1), pmin=0, pmax=1000,
+        shard_depth=4, min_band=1, workers=2, client=FakeClient(responder),
+    )
+
+    assert sorted(int(item.product_id) for item in results) == list(range(1, 11))
+    assert len(results.items) == 10
+
+
+def test_fingerprint_pool_leases_slots_and_retires_blocked():
+    from tokopaedi import FingerprintPool, TokopaediClient, RetryPolicy
+
+    counter = iter(range(1000))
+    pool = FingerprintPool(size=2, max_block_rate=0.5, min_requests=2, generator=lambda: f"fp-{next(counter)}")
+    with pool.lease() as first:
+        with pool.lease() as second:
+            assert pool.stats()["in_use"] == 2
+        with pool.lease() as third:
+            pass
+    # a released slot is reused rather than rotating to the next one
+    with pool.lease() as again:
+        pass
+    assert (first, second, third, again) == ("fp-0", "fp-1", "fp-1", "fp-0")
+    assert pool.stats()["in_use"] == 0
+
+    sent = []
+
+    class FakeSession:
+        def post(self, url, headers, json):
+            sent.append(headers["Fingerprint-Data"])
+            return FakeResponse({"data": {}}, status_code=429 if len(sent) <= 2 else 200)
+
+    client = TokopaediClient(fingerprints=pool, retry=RetryPolicy(max_retries=3, backoff=0))
+    client.session = FakeSession()
+    client.post("/graphql/SearchResult/getProductResult", {"X-Device": "ios"}, {})
+
+    # two blocks in a row retire fp-0; the retry goes out with a replacement
+    assert sent == ["fp-0", "fp-0", "fp-2"]
+    assert pool.stats()["retired"] == 1
+
+
+def recorded_catalog():
+    import os
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with open(os.path.join(root, "output.json")) as f:
+        return json.load(f)
+
+
+def test_fake_server_serves_recorded_catalog_end_to_end():
+    from tokopaedi import TokopaediClient, RetryPolicy, search, get_product, get_reviews
+    from tokopaedi.fake_server import FakeTokopedia, FakeGraphQLServer
+
+    catalog = recorded_catalog()[:12]
+
+    app = FakeTokopedia(catalog, page_size=5, throttle_rate=0.3, seed=7)
+    with FakeGraphQLServer(app) as server:
+        client = TokopaediClient(base_url=server.base_url, retry=RetryPolicy(max_retries=10, backoff=0))
+        results = search("logitech", max_result=100, client=client)
+        assert len(results) == len([item for item in catalog if "logitech" in item["name"].lower()])
+
+        expected = catalog[0]
+        product = get_product(url=expected["product_detail"]["url"], client=client)
+        assert product.to_dict() == expected["product_detail"]
+        reviews = get_reviews(expected["product_id"], max_result=7, page_size=3, client=client)
+        assert [r.feedback_id for r in reviews] == [r["feedback_id"] for r in expected["product_reviews"][:7]]
+        client.close()
+
+    assert app.stats[("search", 429)] > 0
+    assert app.stats[("search", 200)] == 3
+
+
+def test_prometheus_metrics_record_requests_retries_and_stages():
+    from tokopaedi import PrometheusMetrics, ResponseCache, TokopaediClient, RetryPolicy, get_product
+    from tokopaedi.fake_server import FakeTokopedia, FakeGraphQLServer
+
+    catalog = recorded_catalog()[:3]
+
+    metrics = PrometheusMetrics()
+    app = FakeTokopedia(catalog, throttle_rate=0.5, seed=3)
+    with FakeGraphQLServer(app) as server:
+        client = TokopaediClient(base_url=server.base_url, retry=RetryPolicy(max_retries=20, backoff=0),
+                                 cache=ResponseCache(":memory:"), metrics=metrics)
+        for _ in range(2):
+            assert get_product(product_id=catalog[0]["product_id"], client=client) is not None
+        client.close()
+
+    throttled = app.stats[("product", 429)]
+    assert metrics.counter("requests_total", endpoint="product", status="429") == throttled
+    assert metrics.counter("requests_total", endpoint="product", status="200") == 1
+    assert metrics.counter("retries_total", endpoint="product") == throttled
+    assert metrics.counter("cache_hits_total", endpoint="product") == 1
+
+    text = metrics.render()
+    assert '# TYPE tokopaedi_request_duration_seconds histogram' in text
+    assert f'tokopaedi_request_duration_seconds_count{{endpoint="product"}} {throttled + 1}' in text
+    assert 'tokopaedi_decode_duration_seconds_count{endpoint="product"} 2' in text
+    assert 'tokopaedi_extract_duration_seconds_bucket{endpoint="product",le="+Inf"} 2' in text
+
+
+def test_tracer_links_request_spans_to_crawl_across_threads(tmp_path):
+    from tokopaedi import Tracer, InMemoryExporter, JsonFileExporter, TokopaediClient, ResponseCache, search, enrich
+    from tokopaedi.fake_server import FakeTokopedia, FakeGraphQLServer
+
+    catalog = recorded_catalog()[:4]
+    exporter = InMemoryExporter()
+    tracer = Tracer(exporter)
+    with FakeGraphQLServer(FakeTokopedia(catalog, page_size=10)) as server:
+        client = TokopaediClient(base_url=server.base_url, cache=ResponseCache(":memory:"))
+        with tracer.crawl("nightly", keyword="logitech") as root:
+            results = search("logitech", max_result=10, client=client)
+            enrich(results, reviews=3, workers=2, client=client)
+            search("logitech", max_result=10, client=client)
+        client.close()
+    # untraced calls record nothing
+    search("logitech", max_result=10, client=FakeClient(lambda path, json_data: search_page([], "")))
+
+    spans = {s.span_id: s for s in exporter.spans}
+    by_name = {}
+    for s in exporter.spans:
+        by_name.setdefault(s.name, []).append(s)
+    assert exporter.spans[-1] is root and root.parent_id is None
+    assert {s.trace_id for s in exporter.spans} == {root.trace_id}
+    assert len(by_name["enrich"]) == len(results)
+    assert all(s.parent_id == root.span_id for s in by_name["search.page"] + by_name["enrich"])
+    for s in by_name["product"] + by_name["reviews.page"]:
+        parent = spans[s.parent_id]
+        assert parent.name == "enrich" and str(parent.attributes["product_id"]) == s.attributes["product_id"]
+        assert s.thread != root.thread
+    first, repeat = by_name["search.page"]
+    assert first.attributes["cache_hit"] is False and first.attributes["bytes"] > 0
+    assert repeat.attributes["cache_hit"] is True and first.attributes["page"] == "1"
+
+    file_tracer = Tracer(JsonFileExporter(str(tmp_path / "trace.jsonl")))
+    with file_tracer.crawl("empty"):
+        pass
+    file_tracer.exporter.close()
+    line = json.loads((tmp_path / "trace.jsonl").read_text())
+    assert line["name"] == "empty" and line["end_time_unix_nano"] >= line["start_time_unix_nano"]
+
+
+def test_price_monitor_stores_only_changed_fields(tmp_path):
+    from tokopaedi import PriceMonitor, TokopaediClient
+    from tokopaedi.fake_server import FakeTokopedia, FakeGraphQLServer
+
+    catalog = [item for item in recorded_catalog() if item["product_detail"]["variants"]][:2]
+    watched, other = catalog
+    variant = watched["product_detail"]["variants"][0]
+    variant_field = f"variant.{'-'.join(str(x) for x in variant['option_ids'])}.stock"
+
+    events = []
+    with FakeGraphQLServer(FakeTokopedia(catalog)) as server, PriceMonitor(str(tmp_path / "monitor.sqlite")) as monitor:
+        client = TokopaediClient(base_url=server.base_url)
+        watchlist = [watched["product_id"], other["product_id"], 1]
+
+        first = monitor.check(watchlist, client=client)
+        assert len(first) == 2 and all(event.first_seen for event in first)
+        assert [outcome.status for outcome in monitor.failed] == ["not_found"]
+        assert monitor.check(watchlist, client=client) == []
+
+        watched["product_detail"]["product_price"] += 1000
+        variant["stock"] = 7
+        monitor.check(watchlist, client=client, on_change=events.append)
+        client.close()
+
+        product_id = str(watched["product_id"])
+        price = watched["product_detail"]["product_price"]
+        assert len(events) == 1 and events[0].product_id == product_id and not events[0].first_seen
+        assert events[0].changes == {"product_price": [price - 1000, price], variant_field: [0, 7]}
+
+        rows = monitor.conn.execute("SELECT delta FROM deltas WHERE product_id = ? ORDER BY id", (product_id,)).fetchall()
+        assert json.loads(rows[-1][0]) == {"product_price": price, variant_field: 7}
+        history = monitor.history(product_id)
+        assert [state["product_price"] for _, state in history] == [price - 1000, price]
+        assert monitor.latest(product_id)[variant_field] == 7
+
+
+def test_sharded_search_splits_when_server_caps_pagination_below_shard_depth():
+    from tokopaedi import sharded_search, TokopaediClient
+    from tokopaedi.fake_server import FakeTokopedia, FakeGraphQLServer
+
+    catalog = recorded_catalog()[:10]
+    # two pages of two items per query, far below the default shard_depth
+    app = FakeTokopedia(catalog, page_size=2, max_pages=2)
+    with FakeGraphQLServer(app) as server:
+        client = TokopaediClient(base_url=server.base_url)
+        for profile in ("full", "minimal"):
+            results = sharded_search("zzz", workers=4, client=client, profile=profile)
+            assert sorted(item.product_id for item in results) == sorted(item["product_id"] for item in catalog)
+        client.close()
+
+
+def test_client_does_not_cache_graphql_errors():
+    from tokopaedi import TokopaediClient, ResponseCache, get_product
+
+    bodies = [
+        {"data": {"pdpGetLayout": None}, "errors": [{"message": "product not found"}]},
+        {"data": None},
+        pdp_payload(1),
+    ]
+
+    class FakeSession:
+        calls = 0
+
+        def post(self, url, headers, json):
+            FakeSession.calls += 1
+            return FakeResponse(bodies.pop(0))
+
+    client = TokopaediClient(cache=ResponseCache(":memory:"))
+    client.session = FakeSession()
+    assert get_product(product_id=1, client=client).product_id is None
+    assert get_product(product_id=1, client=client).product_id is None
+    assert get_product(product_id=1, client=client).product_id == "1"
+    assert get_product(product_id=1, client=client).product_id == "1"
+    assert FakeSession.calls == 3
+
+
+def test_async_fetchers_against_fake_server(tmp_path):
+    import asyncio
+    from tokopaedi import AsyncTokopaediClient, CrawlJournal, async_search, async_get_product, async_get_reviews
+    from tokopaedi.fake_server import FakeTokopedia, FakeGraphQLServer
+
+    catalog = recorded_catalog()[:12]
+    expected = catalog[0]
+    logitech = [item["product_id"] for item in catalog if "logitech" in item["name"].lower()]
+
+    async def crawl(base_url):
+        async with AsyncTokopaediClient(base_url=base_url) as client:
+            with CrawlJournal(str(tmp_path / "journal.jsonl")) as journal:
+                results = await async_search("logitech", max_result=100, client=client, journal=journal)
+                again = await async_search("logitech", max_result=100, client=client, journal=journal)
+            product, reviews = await asyncio.gather(
+                async_get_product(url=expected["product_detail"]["url"], client=client),
+                async_get_reviews(expected["product_id"], max_result=7, page_size=3, client=client),
+            )
+        return results, again, product, reviews
+
+    with FakeGraphQLServer(FakeTokopedia(catalog, page_size=2)) as server:
+        results, again, product, reviews = asyncio.run(crawl(server.base_url))
+
+    assert [item.product_id for item in results] == logitech
+    assert len(again) == 0
+    assert product.to_dict() == expected["product_detail"]
+    assert [r.feedback_id for r in reviews] == [r["feedback_id"] for r in expected["product_reviews"][:7]]
+
+
+def test_default_async_client_is_kept_per_event_loop(monkeypatch):
+    import asyncio
+    from tokopaedi import async_get_product
+    from tokopaedi.client import get_default_async_client
+    from tokopaedi.fake_server import FakeTokopedia, FakeGraphQLServer
+
+    catalog = recorded_catalog()[:2]
+
+    async def fetch():
+        client = get_default_async_client()
+        assert get_default_async_client() is client
+        product = await async_get_product(product_id=catalog[1]["product_id"])
+        await client.close()
+        return client, product
+
+    with FakeGraphQLServer(FakeTokopedia(catalog)) as server:
+        monkeypatch.setenv("TOKOPAEDI_BASE_URL", server.base_url)
+        first, product = asyncio.run(fetch())
+        second, _ = asyncio.run(fetch())
+
+    assert first is not second
+    assert first.base_url == server.base_url
+    assert product.product_id == str(catalog[1]["product_id"])
+
+
+def test_crawl_journal_resumes_after_a_failed_search_page(tmp_path):
+    from urllib.parse import parse_qs
+    from tokopaedi import search, search_many, CrawlJournal
+
+    pages = {"1": ([1, 2], "page=2"), "2": ([3, 4], "page=3"), "3": ([5], "")}
+    failing = {"2"}
+
+    def responder(path, json_data):
+        page = parse_qs(json_data["variables"]["params"])["page"][0]
+        if page in failing:
+            return FakeResponse({}, status_code=429)
+        return search_page(*pages[page])
+
+    path = str(tmp_path / "journal.jsonl")
+    with CrawlJournal(path) as journal:
+        assert search("mouse", client=FakeClient(responder), journal=journal) is None
+        assert [item.product_id for item in search_many(["mouse"], client=FakeClient(responder), journal=journal)] == []
+
+    failing.clear()
+    with CrawlJournal(path) as journal:
+        resumed = search("mouse", client=FakeClient(responder), journal=journal)
+    assert [item.product_id for item in resumed] == ["3", "4", "5"]
+
+
+def test_search_reports_failed_pages_instead_of_truncating():
+    import asyncio
+    import pytest
+    from urllib.parse import parse_qs
+    from tokopaedi import search, search_iter, async_search, SearchPageError
+
+    def responder(path, json_data):
+        if parse_qs(json_data["variables"]["params"])["page"][0] == "1":
+            return search_page([1, 2], "page=2")
+        return {"data": {"searchProductV5": None}, "errors": [{"message": "upstream timeout"}]}
+
+    crawl = search_iter("mouse", client=FakeClient(responder))
+    assert [next(crawl).product_id for _ in range(2)] == ["1", "2"]
+    with pytest.raises(SearchPageError, match="upstream timeout"):
+        next(crawl)
+    assert search("mouse", client=FakeClient(responder)) is None
+
+    class AsyncFakeClient(FakeClient):
+        async def post(self, path, headers, json_data, endpoint=None):
+            return FakeClient.post(self, path, headers, json_data, endpoint)
+
+    assert asyncio.run(async_search("mouse", client=AsyncFakeClient(responder))) is None
+
+
+def test_enrich_streams_from_search_iter(monkeypatch):
+    import importlib
+    import threading
+    from urllib.parse import parse_qs
+    from tokopaedi import search_iter, SearchResults
+
+    enrich_module = importlib.import_module("tokopaedi.enrich")
+    first_enriched = threading.Event()
+    page_two_saw_enrichment = []
+
+    def responder(path, json_data):
+        page = parse_qs(json_data["variables"]["params"])["page"][0]
+        if page == "2":
+            page_two_saw_enrichment.append(first_enriched.wait(5))
+            return search_page([3, 4], "")
+        return search_page([1, 2], "page=2")
+
+    def fake_get_product(product_id, **kwargs):
+        first_enriched.set()
+        return f"detail-{product_id}"
+
+    monkeypatch.setattr(enrich_module, "get_product", fake_get_product)
+    out = enrich_module.enrich(search_iter("mouse", client=FakeClient(responder)), reviews=0, workers=2)
+
+    assert isinstance(out, SearchResults)
+    assert [item.product_id for item in out] == ["1", "2", "3", "4"]
+    assert [item.product_detail for item in out] == ["detail-1", "detail-2", "detail-3", "detail-4"]
+    assert page_two_saw_enrichment == [True]
+
+
+def test_get_reviews_stops_at_the_last_page_in_windows():
+    import asyncio
+    from tokopaedi import get_reviews, async_get_reviews
+
+    total = 12
+
+    def responder(path, json_data):
+        page = json_data["variables"]["page"]
+        limit = json_data["variables"]["limit"]
+        start = (page - 1) * limit
+        return reviews_page(list(range(start, min(start + limit, total))), start + limit < total)
+
+    for workers, pages in ((4, [1, 2, 3, 4, 5]), (1, [1, 2])):
+        client = FakeClient(responder)
+        reviews = get_reviews(123, max_result=200, page_size=10, workers=workers, client=client)
+        assert [r.feedback_id for r in reviews] == list(range(total))
+        assert sorted(req[1]["variables"]["page"] for req in client.requests) == pages
+
+    class AsyncFakeClient(FakeClient):
+        async def post(self, path, headers, json_data, endpoint=None):
+            return FakeClient.post(self, path, headers, json_data, endpoint)
+
+    client = AsyncFakeClient(responder)
+    reviews = asyncio.run(async_get_reviews(123, max_result=200, page_size=10, workers=2, client=client))
+    assert len(reviews) == total
+    assert sorted(req[1]["variables"]["page"] for req in client.requests) == [1, 2, 3]
+
+
+def test_fingerprint_pool_keeps_identities_across_gathered_tasks():
+    import asyncio
+    from tokopaedi import FingerprintPool, AsyncTokopaediClient
+
+    counter = iter(range(1000))
+    pool = FingerprintPool(size=16, generator=lambda: f"fp-{next(counter)}")
+    sent = []
+
+    class FakeSession:
+        async def post(self, url, headers, json):
+            sent.append(headers["Fingerprint-Data"])
+            await asyncio.sleep(0)
+            return FakeResponse({"data": {}})
+
+    async def crawl():
+        client = AsyncTokopaediClient(concurrency=2, fingerprints=pool)
+        client.session = FakeSession()
+        # every gather spawns new tasks; they still share the same two slots
+        for _ in range(3):
+            await asyncio.gather(*(client.send("/graphql", {}, {}) for _ in range(4)))
+
+    asyncio.run(crawl())
+    assert len(sent) == 12
+    assert set(sent) == {"fp-0", "fp-1"}